@@ -0,0 +1,191 @@
+import os
+import queue
+import sys
+import threading
+import time
+from CSVtoJSON import iter_csv_etds
+from ETDStream import iter_batches
+from LoadMetrics import LoadMetrics
+
+DEFAULT_BATCH_SIZES = {"neo4j": 1000, "virtuoso": 100}
+
+# Marks the end of the CSV on the batch queue
+_DONE = object()
+
+def _parse_csv(csv_path, batch_size, batch_queue, stop, metrics, errors):
+    """Producer thread: parse and clean CSV rows into batches on the queue"""
+    try:
+        for batch in metrics.timed(iter_batches(iter_csv_etds(csv_path), batch_size), "parse"):
+            metrics.count("records_parsed", len(batch))
+            batch_queue.put(batch)
+            if stop.is_set():
+                return
+    except Exception as e:
+        errors.append(e)
+    finally:
+        batch_queue.put(_DONE)
+
+def _neo4j_writer():
+    """Return (write, close) for loading batches through Neo4j_loader_v2"""
+    import Neo4j_loader_v2 as loader
+    session = loader.driver.session()
+    cache = loader.DimensionCache(100000)
+
+    def write(batch, batch_num):
+        # Records without a title cannot be MERGEd into a Title node
+        rows = [row for row in map(loader.prepare_etd, batch) if row is not None]
+        if not rows:
+            return True, 0
+        if not loader.load_batch(session, rows, batch_num, cache):
+            return False, 0
+        return True, len(rows)
+
+    def close():
+        session.close()
+        cache.report()
+
+    return write, close
+
+def _virtuoso_writer():
+    """Return (write, close) for loading batches through VirtuosoLoader"""
+    import VirtuosoLoader as loader
+    size_limit = loader.RequestSizeLimit()
+
+    def write(batch, batch_num):
+        return loader.load_batch(batch, batch_num, size_limit=size_limit)
+
+    return write, lambda: None
+
+WRITERS = {"neo4j": _neo4j_writer, "virtuoso": _virtuoso_writer}
+
+def run_pipeline(csv_path, backend, batch_size=None, queue_size=4, report_path=None):
+    """
+    Load a CSV file straight into Neo4j or Virtuoso without writing JSON.
+
+    Rows get the same cleaning as convert_csv_to_json. A parser thread
+    fills a bounded queue of batches while this thread writes them, so
+    parsing and writing overlap and at most queue_size batches are held
+    in memory.
+
+    Returns True if every batch loaded.
+    """
+    if not os.path.exists(csv_path):
+        print(f"Error: CSV file '{csv_path}' does not exist")
+        return False
+
+    if batch_size is None:
+        batch_size = DEFAULT_BATCH_SIZES[backend]
+
+    try:
+        write, close = WRITERS[backend]()
+    except Exception as e:
+        print(f"Error setting up {backend} writer: {e}")
+        return False
+
+    start_time = time.time()
+    metrics = LoadMetrics(f"csv-pipeline-{backend}", os.path.abspath(csv_path))
+    batch_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+    parser_thread = threading.Thread(target=_parse_csv, daemon=True,
+                                     args=(csv_path, batch_size, batch_queue, stop, metrics, errors))
+    parser_thread.start()
+
+    loaded = 0
+    batch_num = 0
+    failed_batches = []
+    try:
+        while True:
+            with metrics.stage("wait_for_parse"):
+                batch = batch_queue.get()
+            if batch is _DONE:
+                break
+            batch_num += 1
+            batch_start = time.perf_counter()
+            ok, count = write(batch, batch_num)
+            latency = time.perf_counter() - batch_start
+            metrics.record_batch(latency, count, ok)
+            metrics.add_stage_time("write", latency)
+            if ok:
+                loaded += count
+            else:
+                failed_batches.append(batch_num)
+    except Exception as e:
+        print(f"Error loading ETDs into {backend}: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        # Unblock the parser if the writer stopped early
+        stop.set()
+        while parser_thread.is_alive():
+            try:
+                batch_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        close()
+
+    if errors:
+        print(f"Error reading CSV file: {errors[0]}")
+        return False
+
+    elapsed_time = time.time() - start_time
+    parsed = metrics.counters.get("records_parsed", 0)
+    print(f"Loaded {loaded} of {parsed} ETDs from {csv_path} into {backend} in {batch_num} batches "
+          f"of up to {batch_size} ({elapsed_time:.2f} seconds)")
+    if failed_batches:
+        print(f"Failed batches: {failed_batches}")
+
+    if report_path is None:
+        report_path = f"{csv_path}.report.json"
+    report = metrics.write_json(report_path, params={"backend": backend, "batch_size": batch_size,
+                                                     "queue_size": queue_size},
+                                failed_batches=failed_batches)
+    stages = report["stages_seconds"]
+    print(f"Throughput: {report['records_per_second']} ETDs/sec "
+          f"(parse {stages.get('parse', 0)}s, write {stages.get('write', 0)}s, "
+          f"writer idle {stages.get('wait_for_parse', 0)}s)")
+    print(f"Load report written to {report_path}")
+    return not failed_batches
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stream ETD metadata from CSV straight into Neo4j or Virtuoso")
+    parser.add_argument("csv_file", help="Path to the input CSV file (.gz/.zst compressed files are accepted)")
+    parser.add_argument("--backend", choices=sorted(WRITERS), default="neo4j", help="Database to load into")
+    parser.add_argument("--batch-size", type=int, help="ETDs written per batch (default: 1000 for neo4j, 100 for virtuoso)")
+    parser.add_argument("--queue-size", type=int, default=4, help="Parsed batches buffered ahead of the writer")
+    parser.add_argument("--report", help="Load report path (default: <csv_file>.report.json)")
+    parser.add_argument("--uri", default="bolt://localhost:7687", help="Neo4j connection URI")
+    parser.add_argument("--username", default="neo4j", help="Neo4j username")
+    parser.add_argument("--password", default="", help="Neo4j password")
+    parser.add_argument("--skip-schema", action="store_true", help="Do not create Neo4j constraints and indexes before loading")
+    args = parser.parse_args()
+
+    if args.batch_size is not None and args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.queue_size < 1:
+        parser.error("--queue-size must be at least 1")
+
+    if args.backend == "neo4j":
+        import Neo4j_loader_v2
+
+        # Update connection if needed
+        if args.uri != "bolt://localhost:7687" or args.username != "neo4j" or args.password:
+            from neo4j import GraphDatabase
+            Neo4j_loader_v2.driver = GraphDatabase.driver(args.uri, auth=(args.username, args.password), encrypted=False)
+            print(f"Using custom connection to {args.uri}")
+
+        if not Neo4j_loader_v2.check_neo4j_version():
+            print("Failed to connect to Neo4j. Please check that Neo4j is running and try again.")
+            sys.exit(1)
+        if not args.skip_schema and not Neo4j_loader_v2.create_schema():
+            print("Failed to create schema. Aborting.")
+            sys.exit(1)
+
+    if not run_pipeline(args.csv_file, args.backend, args.batch_size, args.queue_size, args.report):
+        print("Failed to load ETDs. Please check the errors above.")
+        sys.exit(1)
+
+    print("ETD loading process completed successfully!")
@@ -3,52 +3,85 @@ import json
 import argparse
 import sys
 import os
+import hashlib
+import io
+from contextlib import ExitStack
+from multiprocessing import Pool
+from DeltaManifest import record_hash
+from ETDSchema import DIMENSIONS, abstract_key
+from ETDStream import open_text, strip_compression
+from ETDValidator import ETDValidator
 
-def convert_csv_to_json(csv_path, json_path):
+# Define the output fields structure
+REQUIRED_FIELDS = [
+    "id", "title", "author", "advisor", "year", 
+    "abstract", "university", "degree", "URI", 
+    "department", "discipline"
+]
+
+# Low-cardinality columns stored dictionary-encoded in Parquet output
+DICTIONARY_FIELDS = ["year", "university", "degree", "department", "discipline"]
+
+# The neo4j-admin import also carries the remaining dimension columns
+IMPORT_FIELDS = REQUIRED_FIELDS + ["language", "schooltype", "oadsclassifier", "borndigital"]
+
+def clean_row(row, fields):
+    """
+    Keep only the given fields of a CSV row, stripped of whitespace
+
+    Returns None for rows without an id or title
+    """
+    # Create a new dict with required fields (initialized as empty)
+    filtered_row = {field: "" for field in fields}
+    
+    # Copy values from CSV row to our dict
+    for field in row.keys():
+        if field in filtered_row:
+            # Clean empty values and whitespace
+            value = row[field].strip() if row[field] else ""
+            # CSVs are read with newline='' so quoted fields can hold line
+            # breaks; translate them to \n as universal newlines used to
+            if "\r" in value:
+                value = value.replace("\r\n", "\n").replace("\r", "\n")
+            filtered_row[field] = value
+    
+    # Skip empty rows (rows without id or title)
+    if not filtered_row["id"] and not filtered_row["title"]:
+        return None
+        
+    # Ensure degree, department, and discipline are empty strings
+    filtered_row["degree"] = ""
+    filtered_row["department"] = ""
+    filtered_row["discipline"] = ""
+    return filtered_row
+
+def iter_csv_etds(csv_path, fields=REQUIRED_FIELDS, validator=None):
+    """
+    Yield the cleaned ETD records of a CSV file one row at a time
+
+    Rows rejected by the validator, when given, are left out
+    """
+    with open_text(csv_path, 'r', encoding='utf-8-sig', newline='') as csvfile:
+        for row in csv.DictReader(csvfile, delimiter=','):
+            filtered_row = clean_row(row, fields)
+            if filtered_row is None:
+                continue
+            if validator is not None and not validator.accept(filtered_row):
+                continue
+            yield filtered_row
+
+def convert_csv_to_json(csv_path, json_path, validator=None):
     """
     Convert a CSV file to a JSON file with minimal output
     """
     try:
-        # Define the output fields structure
-        required_fields = [
-            "id", "title", "author", "advisor", "year", 
-            "abstract", "university", "degree", "URI", 
-            "department", "discipline"
-        ]
-        
         # Check if the file exists
         if not os.path.exists(csv_path):
             print(f"Error: CSV file '{csv_path}' does not exist")
             return False
             
         # Read CSV file
-        etds = []
-        with open(csv_path, 'r', encoding='utf-8-sig') as csvfile:
-            # Read with DictReader
-            reader = csv.DictReader(csvfile, delimiter=',')
-            
-            # Process all rows
-            for row in reader:
-                # Create a new dict with required fields (initialized as empty)
-                filtered_row = {field: "" for field in required_fields}
-                
-                # Copy values from CSV row to our dict
-                for field in row.keys():
-                    if field in required_fields:
-                        # Clean empty values and whitespace
-                        value = row[field].strip() if row[field] else ""
-                        filtered_row[field] = value
-                
-                # Skip empty rows (rows without id or title)
-                if not filtered_row["id"] and not filtered_row["title"]:
-                    continue
-                    
-                # Ensure degree, department, and discipline are empty strings
-                filtered_row["degree"] = ""
-                filtered_row["department"] = ""
-                filtered_row["discipline"] = ""
-                
-                etds.append(filtered_row)
+        etds = list(iter_csv_etds(csv_path, REQUIRED_FIELDS, validator))
         
         # Check if we have any data
         if not etds:
@@ -56,7 +89,7 @@ def convert_csv_to_json(csv_path, json_path):
             return False
             
         # Write JSON file
-        with open(json_path, 'w', encoding='utf-8') as jsonfile:
+        with open_text(json_path, 'w') as jsonfile:
             json.dump(etds, jsonfile, indent=2)
         
         print(f"Successfully converted {len(etds)} ETDs to {json_path}")
@@ -66,13 +99,411 @@ def convert_csv_to_json(csv_path, json_path):
         print(f"Error: {e}")
         return False
 
+def format_jsonl(row):
+    """One compact JSONL line"""
+    return json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+def format_json_item(row):
+    """A record formatted exactly as json.dump(etds, indent=2) writes list items"""
+    return "\n".join("  " + line for line in json.dumps(row, indent=2).split("\n"))
+
+def _shard_path(json_path, index):
+    """Numbered output file name, e.g. out.jsonl.gz -> out-00003.jsonl.gz"""
+    base = strip_compression(json_path)
+    compression = json_path[len(base):]
+    stem, ext = os.path.splitext(base)
+    return f"{stem}-{index:05d}{ext}{compression}"
+
+def convert_csv_to_jsonl(csv_path, json_path, rows_per_file=None, validator=None):
+    """
+    Stream a CSV file to newline-delimited JSON in constant memory
+    
+    Writes one compact record per line, split into numbered files of at
+    most rows_per_file records when given. Input and output files ending
+    in .gz or .zst are compressed transparently.
+    """
+    try:
+        # Check if the file exists
+        if not os.path.exists(csv_path):
+            print(f"Error: CSV file '{csv_path}' does not exist")
+            return False
+        
+        count = 0
+        out_paths = []
+        out = None
+        try:
+            for filtered_row in iter_csv_etds(csv_path, REQUIRED_FIELDS, validator):
+                # Start the next output file when the current one is full
+                if out is None or (rows_per_file and count % rows_per_file == 0):
+                    if out is not None:
+                        out.close()
+                    path = _shard_path(json_path, len(out_paths)) if rows_per_file else json_path
+                    out = open_text(path, 'w')
+                    out_paths.append(path)
+                
+                out.write(format_jsonl(filtered_row))
+                count += 1
+        finally:
+            if out is not None:
+                out.close()
+        
+        # Check if we have any data
+        if count == 0:
+            print("Error: No data was extracted from the CSV file")
+            return False
+        
+        if len(out_paths) == 1:
+            print(f"Successfully converted {count} ETDs to {out_paths[0]}")
+        else:
+            print(f"Successfully converted {count} ETDs to {len(out_paths)} files: {out_paths[0]} ... {out_paths[-1]}")
+        return True
+    
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+
+def convert_csv_to_parquet(csv_path, parquet_path, batch_rows=65536, validator=None):
+    """
+    Stream a CSV file to a Parquet file with the same records as the JSON output
+    
+    Rows are written in row groups of batch_rows, with low-cardinality
+    columns dictionary-encoded, so both loaders can read it back in
+    memory-mapped record batches instead of parsing JSON. Needs the
+    optional pyarrow package.
+    """
+    try:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("Error: Parquet output requires the pyarrow package (pip install pyarrow)")
+            return False
+        
+        # Check if the file exists
+        if not os.path.exists(csv_path):
+            print(f"Error: CSV file '{csv_path}' does not exist")
+            return False
+        
+        schema = pa.schema([(field, pa.string()) for field in REQUIRED_FIELDS])
+        count = 0
+        rows = []
+        with pq.ParquetWriter(parquet_path, schema, compression="zstd", use_dictionary=DICTIONARY_FIELDS) as writer:
+            for filtered_row in iter_csv_etds(csv_path, REQUIRED_FIELDS, validator):
+                rows.append(filtered_row)
+                if len(rows) >= batch_rows:
+                    writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                    count += len(rows)
+                    rows = []
+            if rows:
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                count += len(rows)
+        
+        # Check if we have any data
+        if count == 0:
+            print("Error: No data was extracted from the CSV file")
+            return False
+        
+        print(f"Successfully converted {count} ETDs to {parquet_path}")
+        return True
+    
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+
+PARALLEL_CHUNK_BYTES = 64 * 1024 * 1024
+
+def _count_quotes(args):
+    """Number of quote characters in a byte range"""
+    csv_path, start, end = args
+    count = 0
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(remaining, 1 << 20))
+            if not block:
+                break
+            count += block.count(b'"')
+            remaining -= len(block)
+    return count
+
+def _find_record_boundary(f, pos, in_quotes):
+    """
+    Offset just past the first newline at or after pos that is outside a
+    quoted field, given whether pos itself is inside quotes. Quoted
+    fields escape quotes by doubling them, so quote parity is enough.
+    """
+    f.seek(pos)
+    while True:
+        block = f.read(1 << 16)
+        if not block:
+            return f.tell()
+        for i, byte in enumerate(block):
+            if byte == 0x22:  # "
+                in_quotes = not in_quotes
+            elif byte == 0x0A and not in_quotes:  # \n
+                return pos + i + 1
+        pos += len(block)
+
+def _convert_range(args):
+    """
+    Convert the CSV records in one byte range (starting and ending on
+    record boundaries) and return (count, formatted output).
+
+    With a shard path the output is written there instead of returned.
+    """
+    csv_path, start, end, fieldnames, jsonl, shard_path = args
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    
+    items = []
+    for row in csv.DictReader(io.StringIO(text, newline=''), fieldnames=fieldnames, delimiter=','):
+        filtered_row = clean_row(row, REQUIRED_FIELDS)
+        if filtered_row is not None:
+            items.append(format_jsonl(filtered_row) if jsonl else format_json_item(filtered_row))
+    
+    output = "".join(items) if jsonl else ",\n".join(items)
+    if shard_path is not None:
+        with open_text(shard_path, 'w') as out:
+            out.write(output)
+        return len(items), None
+    return len(items), output
+
+def convert_csv_parallel(csv_path, json_path, processes, jsonl=False, shard_output=False,
+                         chunk_bytes=PARALLEL_CHUNK_BYTES):
+    """
+    Convert a CSV file using a pool of processes
+    
+    The file is cut into byte ranges, each moved forward to the next
+    record boundary (respecting quoted fields with embedded newlines),
+    converted in parallel and written back in order, so the output is
+    identical to convert_csv_to_json / convert_csv_to_jsonl. With
+    shard_output each range is written to its own numbered JSONL file.
+    """
+    try:
+        # Check if the file exists
+        if not os.path.exists(csv_path):
+            print(f"Error: CSV file '{csv_path}' does not exist")
+            return False
+        if strip_compression(csv_path) != csv_path:
+            print("Error: Parallel conversion needs an uncompressed CSV file")
+            return False
+        
+        file_size = os.path.getsize(csv_path)
+        with open(csv_path, 'rb') as f:
+            header_end = _find_record_boundary(f, 0, False)
+            f.seek(0)
+            header = f.read(header_end).decode('utf-8-sig')
+        fieldnames = next(csv.reader(io.StringIO(header, newline=''), delimiter=','), None)
+        if not fieldnames:
+            print("Error: No data was extracted from the CSV file")
+            return False
+        
+        # Candidate cut points, then the quote parity at each of them
+        num_ranges = max(processes, -(-(file_size - header_end) // chunk_bytes))
+        step = max(1, -(-(file_size - header_end) // num_ranges))
+        cuts = list(range(header_end, file_size, step)) + [file_size]
+        
+        with Pool(processes) as pool:
+            quote_counts = pool.map(_count_quotes, [(csv_path, cuts[i], cuts[i+1]) for i in range(len(cuts) - 1)])
+            
+            # Move each cut forward to the next record boundary
+            boundaries = [header_end]
+            quotes_before = 0
+            with open(csv_path, 'rb') as f:
+                for i in range(1, len(cuts) - 1):
+                    quotes_before += quote_counts[i-1]
+                    boundary = _find_record_boundary(f, cuts[i], quotes_before % 2 == 1)
+                    boundaries.append(max(boundary, boundaries[-1]))
+            boundaries.append(file_size)
+            ranges = [(boundaries[i], boundaries[i+1]) for i in range(len(boundaries) - 1)
+                      if boundaries[i+1] > boundaries[i]]
+            
+            tasks = [(csv_path, start, end, fieldnames, jsonl or shard_output,
+                      _shard_path(json_path, i) if shard_output else None)
+                     for i, (start, end) in enumerate(ranges)]
+            
+            count = 0
+            if shard_output:
+                for range_count, _ in pool.imap(_convert_range, tasks):
+                    count += range_count
+            else:
+                with open_text(json_path, 'w') as out:
+                    if not jsonl:
+                        out.write("[\n")
+                    first = True
+                    for range_count, output in pool.imap(_convert_range, tasks):
+                        if not range_count:
+                            continue
+                        if not jsonl and not first:
+                            out.write(",\n")
+                        out.write(output)
+                        count += range_count
+                        first = False
+                    if not jsonl:
+                        out.write("\n]")
+        
+        # Check if we have any data
+        if count == 0:
+            print("Error: No data was extracted from the CSV file")
+            return False
+        
+        where = f"{len(tasks)} shards like {tasks[0][5]}" if shard_output else json_path
+        print(f"Successfully converted {count} ETDs to {where} using {processes} processes")
+        return True
+    
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+def export_neo4j_import(csv_path, out_dir):
+    """
+    Convert a CSV file straight to neo4j-admin database import files
+    
+    Writes one node file per label and one relationship file per type,
+    with the same labels and relationship types Neo4j_loader_v2.py uses.
+    Dimension values get one integer ID each; Abstracts are keyed on a
+    digest of their text, as in the loader. Like the loader's MERGE on Title value,
+    rows repeating an earlier title are folded into the first one.
+    """
+    try:
+        if not os.path.exists(csv_path):
+            print(f"Error: CSV file '{csv_path}' does not exist")
+            return False
+        os.makedirs(out_dir, exist_ok=True)
+        
+        node_ids = {field: {} for field, _, _, _ in DIMENSIONS}
+        seen_titles = set()
+        title_count = 0
+        duplicate_titles = 0
+        
+        with ExitStack() as stack:
+            def open_writer(name, header):
+                f = stack.enter_context(open(os.path.join(out_dir, name), 'w', encoding='utf-8', newline=''))
+                writer = csv.writer(f)
+                writer.writerow(header)
+                return writer
+            
+            # Unnamed :ID columns, so the import ids are not stored as
+            # properties the transactional loader never sets
+            title_writer = open_writer("nodes_Title.csv", [":ID(Title)", "value", "id", "uri", "hash"])
+            node_writers = {field: open_writer(f"nodes_{label}.csv", [f":ID({label})", key]
+                                               + (["text"] if field == "abstract" else []))
+                            for field, label, key, _ in DIMENSIONS}
+            rel_writers = {field: open_writer(f"rels_{rel}.csv", [":START_ID(Title)", f":END_ID({label})"])
+                           for field, label, _, rel in DIMENSIONS}
+            
+            with open_text(csv_path, 'r', encoding='utf-8-sig', newline='') as csvfile:
+                for row in csv.DictReader(csvfile, delimiter=','):
+                    etd = clean_row(row, IMPORT_FIELDS)
+                    if etd is None or not etd["title"]:
+                        continue
+                    
+                    title_key = _digest(etd["title"])
+                    if title_key in seen_titles:
+                        duplicate_titles += 1
+                        continue
+                    seen_titles.add(title_key)
+                    title_count += 1
+                    
+                    # Same shape as the loader's prepared row, so Title.hash
+                    # matches what a later delta load computes. Loads read the
+                    # JSON/JSONL/Parquet output, which only has REQUIRED_FIELDS,
+                    # so the extra import columns are hashed as empty there too
+                    record = {"id": etd["id"], "title": etd["title"], "uri": etd["URI"]}
+                    for field, _, _, _ in DIMENSIONS:
+                        record[field] = etd[field] if field in REQUIRED_FIELDS else ""
+                    title_writer.writerow([title_count, etd["title"], etd["id"], etd["URI"], record_hash(record)])
+                    
+                    for field, _, _, _ in DIMENSIONS:
+                        value = etd.get(field, "")
+                        if not value:
+                            continue
+                        key = abstract_key(value) if field == "abstract" else value
+                        node_id = node_ids[field].get(key)
+                        if node_id is None:
+                            node_id = len(node_ids[field]) + 1
+                            node_ids[field][key] = node_id
+                            node_writers[field].writerow([node_id, key] + ([value] if field == "abstract" else []))
+                        rel_writers[field].writerow([title_count, node_id])
+        
+        if title_count == 0:
+            print("Error: No data was extracted from the CSV file")
+            return False
+        
+        counts = ", ".join(f"{label}={len(node_ids[field])}" for field, label, _, _ in DIMENSIONS)
+        print(f"Exported {title_count} Titles to {out_dir} ({duplicate_titles} duplicate titles folded)")
+        print(f"Dimension nodes: {counts}")
+        
+        command = ["neo4j-admin database import full", "--multiline-fields=true",
+                   f"--nodes=Title={os.path.join(out_dir, 'nodes_Title.csv')}"]
+        command += [f"--nodes={label}={os.path.join(out_dir, f'nodes_{label}.csv')}" for _, label, _, _ in DIMENSIONS]
+        command += [f"--relationships={rel}={os.path.join(out_dir, f'rels_{rel}.csv')}" for _, _, _, rel in DIMENSIONS]
+        command.append("neo4j")
+        print("Import with (database stopped), then run Neo4j_loader_v2.py --schema-only:")
+        print(" \\\n    ".join(command))
+        return True
+    
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Convert ETD CSV to JSON with specific fields")
     parser.add_argument("csv_file", help="Path to the CSV file")
-    parser.add_argument("json_file", help="Path for the output JSON file")
+    parser.add_argument("json_file", nargs="?", help="Path for the output JSON file (.jsonl for JSONL, .parquet for Parquet)")
+    parser.add_argument("--neo4j-import", metavar="DIR", help="Write neo4j-admin import CSV files to DIR instead of JSON")
+    parser.add_argument("--jsonl", action="store_true", help="Stream one compact record per line (implied by a .jsonl output name)")
+    parser.add_argument("--rows-per-file", type=int, help="Split JSONL output into numbered files of this many records")
+    parser.add_argument("--processes", type=int, default=1, help="Convert byte ranges of the CSV in this many processes")
+    parser.add_argument("--shard-output", action="store_true", help="With --processes, write one numbered JSONL file per byte range")
+    parser.add_argument("--validate", action="store_true", help="Reject rows without a title or with a duplicate id, URI or normalized title")
+    parser.add_argument("--rejects", help="Rejected rows file with --validate (default: <json_file>.rejects.jsonl)")
+    parser.add_argument("--expected-rows", type=int, default=1000000, help="Approximate row count, used to size the duplicate check")
     args = parser.parse_args()
     
-    if not convert_csv_to_json(args.csv_file, args.json_file):
+    if args.rows_per_file is not None and args.rows_per_file < 1:
+        parser.error("--rows-per-file must be at least 1")
+    if args.processes < 1:
+        parser.error("--processes must be at least 1")
+    parquet = bool(args.json_file) and args.json_file.endswith(".parquet")
+    if args.processes > 1 and (args.neo4j_import or args.rows_per_file or parquet):
+        parser.error("--processes cannot be combined with --neo4j-import, --rows-per-file or Parquet output")
+    if args.shard_output and args.processes == 1:
+        parser.error("--shard-output requires --processes")
+    if args.validate and (args.processes > 1 or args.neo4j_import):
+        parser.error("--validate cannot be combined with --processes or --neo4j-import")
+    jsonl = args.jsonl or bool(args.rows_per_file) or (args.json_file and strip_compression(args.json_file).endswith(".jsonl"))
+    
+    if not args.neo4j_import and not args.json_file:
+        parser.error("json_file is required unless --neo4j-import is given")
+    
+    # Bad rows are filtered out here, before any database write
+    validator = None
+    if args.validate:
+        validator = ETDValidator(args.rejects or f"{strip_compression(args.json_file)}.rejects.jsonl", args.expected_rows)
+    
+    try:
+        if args.neo4j_import:
+            success = export_neo4j_import(args.csv_file, args.neo4j_import)
+        elif parquet:
+            success = convert_csv_to_parquet(args.csv_file, args.json_file, validator=validator)
+        elif args.processes > 1:
+            success = convert_csv_parallel(args.csv_file, args.json_file, args.processes, jsonl, args.shard_output)
+        elif jsonl:
+            success = convert_csv_to_jsonl(args.csv_file, args.json_file, args.rows_per_file, validator)
+        else:
+            success = convert_csv_to_json(args.csv_file, args.json_file, validator)
+    finally:
+        if validator is not None:
+            validator.close()
+            validator.report()
+    
+    if not success:
         sys.exit(1)
     
     print("Conversion completed successfully!")
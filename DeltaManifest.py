@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import threading
+
+def record_hash(record):
+    """Stable content digest of an ETD record (key order does not matter)"""
+    canonical = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+class DeltaManifest:
+    """
+    Map of record key -> content hash for everything already loaded into
+    a database, used to write only new or changed records on a reload.
+    The key is whatever the database stores a record under: the Title
+    value for Neo4j, the ETD id (subject IRI) for Virtuoso.
+
+    Records are classified against the hashes from the previous run;
+    hashes are only updated once the batch holding the record commits,
+    so an interrupted delta load can simply be rerun.
+
+    Later records repeating a key in the same run are merged into what
+    the first one wrote, so they are always written but never replace
+    it, and only the first record's hash is kept.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hashes = {}
+        self.first = {}  # key -> hash of its first record in this run
+        self.counts = {"new": 0, "changed": 0, "unchanged": 0, "repeated": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path):
+        manifest = cls(path)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                manifest.hashes = json.load(f)
+            print(f"Loaded delta manifest {path} with {len(manifest.hashes)} records")
+        return manifest
+
+    def classify(self, key, digest):
+        """Return "new", "changed", "unchanged" or "repeated" and remember the key as seen"""
+        if not key:
+            # Records without a key cannot be tracked, so always write them
+            return "new"
+        if key in self.first:
+            return "repeated"
+        self.first[key] = digest
+        previous = self.hashes.get(key)
+        if previous is None:
+            return "new"
+        return "unchanged" if previous == digest else "changed"
+
+    def filter(self, records, key, count=True):
+        """
+        Yield (record, status) for records that are new or changed.
+
+        key(record) returns the record's (key, hash).
+        """
+        for record in records:
+            status = self.classify(*key(record))
+            if count:
+                self.counts[status] += 1
+            if status != "unchanged":
+                yield record, status
+
+    def commit(self, pairs):
+        """Record the hashes of (key, hash) pairs that were just written"""
+        with self._lock:
+            for key, digest in pairs:
+                if key and self.first.get(key, digest) == digest:
+                    self.hashes[key] = digest
+
+    def missing(self):
+        """Keys in the manifest that were not in this run's input"""
+        return [key for key in self.hashes if key not in self.first]
+
+    def remove(self, keys):
+        with self._lock:
+            for key in keys:
+                self.hashes.pop(key, None)
+
+    def report(self):
+        counts = self.counts
+        print(f"Delta: {counts['new']} new, {counts['changed']} changed, {counts['unchanged']} unchanged, "
+              f"{counts['repeated']} repeated keys")
+
+    def save(self):
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.hashes, f)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,27 @@
+# Shared description of the ETD property graph, used by the Neo4j loader
+# and the neo4j-admin import export so both build the same graph.
+import hashlib
+
+# (ETD field, node label, key property, relationship type) for every
+# node hanging off a Title
+DIMENSIONS = [
+    ("author", "Author", "name", "HAS_AUTHOR"),
+    ("advisor", "Advisor", "name", "ACADEMIC_ADVISOR"),
+    ("year", "Year", "value", "PUBLISHED_IN"),
+    ("abstract", "Abstract", "hash", "HAS_ABSTRACT"),
+    ("university", "University", "name", "PUBLISHED_BY"),
+    ("department", "Department", "name", "ACADEMIC_DEPARMENT"),
+    ("discipline", "Discipline", "name", "ACADEMIC_DISCIPLINE"),
+    ("degree", "Degree", "name", "DEGREE_TYPE"),
+    ("language", "Language", "name", "WRITTEN_IN"),
+    ("schooltype", "SchoolType", "type", "OF_SCHOOL_TYPE"),
+    ("oadsclassifier", "OadsClassifier", "value", "HAS_CLASSIFICATION"),
+    ("borndigital", "BornDigital", "value", "IS_BORN_DIGITAL"),
+]
+
+def abstract_key(text):
+    """
+    Abstract nodes are keyed on a digest of their text, which is kept
+    in an unindexed text property, so the key stays small enough to index.
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
@@ -0,0 +1,141 @@
+import time
+
+PREDICATE_BASE = "http://etdkb.endeavour.cs.vt.edu/v1/predicate/"
+OBJECT_BASE = "http://etdkb.endeavour.cs.vt.edu/v1/objects/"
+
+# Predicate local names, in the order triples are written for an ETD
+PREDICATES = [
+    "hasTitle", "Author", "hasAuthor", "issuedDate", "identifier", "hasAbstract",
+    "academicDepartment", "academicAdvisor", "academicDiscipline", "publishedBy",
+    "hasKeyword", "hasPart",
+]
+NT_PREDICATES = {name: f"<{PREDICATE_BASE}{name}>" for name in PREDICATES}
+TURTLE_PREDICATES = {name: f"p:{name}" for name in PREDICATES}
+TURTLE_PREFIXES = f"@prefix p: <{PREDICATE_BASE}> .\n\n"
+
+# Backslash first so the escapes added after it are not doubled. Chained
+# str.replace runs in C and measured ~10x faster than str.translate with
+# multi-character replacements
+_ESCAPES = [("\\", "\\\\"), ('"', '\\"'), ("\n", "\\n"), ("\r", "\\r"), ("\t", "\\t")]
+
+def escape_literal(text):
+    """Escape text for a quoted SPARQL/N-Triples literal, dropping non-printable characters"""
+    if not text:
+        return ""
+    for char, escaped in _ESCAPES:
+        text = text.replace(char, escaped)
+    # Almost every string is printable, so only filter when needed
+    if not text.isprintable():
+        text = "".join(filter(str.isprintable, text))
+    return text
+
+def etd_iri(etd_id):
+    """IRI term of the ETD with this id"""
+    return f"<{OBJECT_BASE}{etd_id}>"
+
+def etd_terms(etd):
+    """
+    Return (subject, [(predicate name, object term), ...]) for one ETD,
+    with the subject and objects already formatted as IRIs or literals
+    """
+    etd_id = etd['id']
+    subject = etd_iri(etd_id)
+    pairs = [
+        ("hasTitle", f'"{escape_literal(etd["title"])}"'),
+        ("Author", f'"{escape_literal(etd["author"])}"'),
+        ("hasAuthor", f"<{OBJECT_BASE}author{etd_id}>"),
+    ]
+
+    if etd.get('year'):
+        pairs.append(("issuedDate", f'"{int(etd["year"])}"'))
+    if etd.get('URI'):
+        pairs.append(("identifier", f'"{escape_literal(etd["URI"])}"'))
+    if etd.get('abstract'):
+        pairs.append(("hasAbstract", f'"{escape_literal(etd["abstract"])}"'))
+    if etd.get('department'):
+        pairs.append(("academicDepartment", f"<{OBJECT_BASE}{escape_literal(etd['department']).replace(' ', '-')}>"))
+    if etd.get('advisor'):
+        pairs.append(("academicAdvisor", f'"{escape_literal(etd["advisor"])}"'))
+    if etd.get('discipline'):
+        pairs.append(("academicDiscipline", f"<{OBJECT_BASE}{escape_literal(etd['discipline']).replace(' ', '-')}>"))
+    if etd.get('university'):
+        university = etd['university'].replace(' ', '-').replace('\r', '').replace('\n', '')
+        pairs.append(("publishedBy", f"<{OBJECT_BASE}{university}>"))
+
+    # Keywords as literals and as object references
+    for keyword in etd.get('keywords') or ():
+        if keyword:
+            keyword = escape_literal(keyword)
+            pairs.append(("hasKeyword", f'"{keyword}"'))
+            pairs.append(("hasPart", f"<{OBJECT_BASE}{keyword.replace(' ', '-')}>"))
+    return subject, pairs
+
+def etd_triples(etd):
+    """N-Triples statements for one ETD, without line endings"""
+    subject, pairs = etd_terms(etd)
+    return [f"{subject} {NT_PREDICATES[name]} {obj} ." for name, obj in pairs]
+
+def to_ntriples(etds):
+    parts = []
+    for etd in etds:
+        parts.extend(etd_triples(etd))
+    parts.append("")
+    return "\n".join(parts)
+
+def to_turtle(etds):
+    """Turtle with the predicate namespace prefixed and triples grouped by subject"""
+    parts = [TURTLE_PREFIXES]
+    for etd in etds:
+        subject, pairs = etd_terms(etd)
+        parts.append(subject)
+        parts.append(" ")
+        parts.append(" ;\n    ".join(f"{TURTLE_PREDICATES[name]} {obj}" for name, obj in pairs))
+        parts.append(" .\n")
+    return "".join(parts)
+
+def insert_data_query(etds, graph_uri):
+    """SPARQL INSERT DATA query adding the ETDs to graph_uri"""
+    parts = [f"INSERT DATA {{ GRAPH <{graph_uri}> {{"]
+    for etd in etds:
+        for triple in etd_triples(etd):
+            parts.append("\n")
+            parts.append(triple)
+    # Close the query - exactly two closing braces, no more
+    parts.append("\n}}")
+    return "".join(parts)
+
+FORMATS = {
+    "sparql": lambda etds: insert_data_query(etds, "http://erdkb.endeavour.cs.vt.edu/ETDs"),
+    "ntriples": to_ntriples,
+    "turtle": to_turtle,
+}
+
+def benchmark(etds, repeat=5, batch_size=100):
+    """Serialize the ETDs in batches with every format and print throughput in MB/s"""
+    batches = [etds[i:i+batch_size] for i in range(0, len(etds), batch_size)]
+    for name, serialize in FORMATS.items():
+        best = None
+        size = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            size = sum(len(serialize(batch).encode("utf-8")) for batch in batches)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        rate = size / best / 1e6 if best > 0 else float("inf")
+        print(f"{name:>9}: {size/1e6:8.2f} MB in {best:.3f} seconds, {rate:.1f} MB/s, "
+              f"{len(etds)/best:.0f} ETDs/sec")
+
+if __name__ == "__main__":
+    import argparse
+    from ETDStream import iter_etds
+
+    parser = argparse.ArgumentParser(description="Benchmark ETD triple serialization throughput")
+    parser.add_argument("json_file", help="Path to the JSON file containing ETD metadata")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per format; the fastest is reported")
+    parser.add_argument("--batch-size", type=int, default=100, help="ETDs serialized per call")
+    parser.add_argument("--scale", type=int, default=1, help="Repeat the input records this many times")
+    args = parser.parse_args()
+
+    etds = list(iter_etds(args.json_file)) * args.scale
+    print(f"Serializing {len(etds)} ETDs in batches of {args.batch_size}")
+    benchmark(etds, args.repeat, args.batch_size)
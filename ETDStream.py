@@ -0,0 +1,211 @@
+import gzip
+import io
+import json
+
+CHUNK_SIZE = 1 << 20  # 1 MB reads
+
+COMPRESSION_SUFFIXES = (".gz", ".zst")
+
+def strip_compression(path):
+    """Return path without a trailing .gz/.zst suffix"""
+    for suffix in COMPRESSION_SUFFIXES:
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+def open_text(path, mode="r", encoding="utf-8", newline=None):
+    """
+    Open a text file, transparently (de)compressing .gz and .zst files.
+
+    zstd support needs the optional zstandard package.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding=encoding, newline=newline)
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Reading or writing .zst files requires the zstandard package (pip install zstandard)")
+        if "r" in mode:
+            stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(open(path, "wb"))
+        return io.TextIOWrapper(stream, encoding=encoding, newline=newline)
+    return open(path, mode, encoding=encoding, newline=newline)
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+# Characters that can follow a complete number or literal
+_DELIMITERS = _WHITESPACE + ",]}:"
+
+class _Buffer:
+    """Sliding text buffer over a file that refills on demand"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, min_size=0):
+        """
+        Read another chunk of at least min_size characters. The consumed
+        prefix is only dropped once it is most of the buffer, so refills
+        do not copy the unread text every time.
+        """
+        if self.eof:
+            return False
+        chunk = self.f.read(max(self.chunk_size, min_size))
+        if not chunk:
+            self.eof = True
+            return False
+        if self.pos > len(self.text) // 2:
+            self.text = self.text[self.pos:] + chunk
+            self.pos = 0
+        else:
+            self.text += chunk
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it"""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}, found '{self.peek()}'")
+        self.pos += 1
+
+    def decode(self):
+        """Decode the next complete JSON value, reading more input as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+                # Objects, arrays and strings end with their closing
+                # character; a number or literal is only complete when a
+                # delimiter follows it, since "3e10" read as "3e" parses as 3
+                if (isinstance(value, (dict, list, str)) or self.eof
+                        or (end < len(self.text) and self.text[end] in _DELIMITERS)):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Read at least as much again as is pending, so a large value
+            # is decoded a logarithmic number of times rather than once per chunk
+            self.fill(len(self.text) - self.pos)
+
+def _iter_array(buf):
+    """Yield the elements of the JSON array starting at the buffer position"""
+    buf.expect("[")
+    if buf.peek() == "]":
+        buf.pos += 1
+        return
+    while True:
+        yield buf.decode()
+        sep = buf.peek()
+        buf.pos += 1
+        if sep == "]":
+            return
+        if sep != ",":
+            raise ValueError(f"Expected ',' or ']' in array, found '{sep}'")
+
+def _iter_object(buf):
+    """
+    Yield the records of a top-level object: the items of its first
+    non-empty array field, or the object itself if it has none.
+    """
+    buf.expect("{")
+    fields = {}
+    while buf.peek() != "}":
+        if fields:
+            buf.expect(",")
+        key = buf.decode()
+        buf.expect(":")
+        if buf.peek() == "[":
+            count = 0
+            for item in _iter_array(buf):
+                if count == 0:
+                    print(f"Found ETD array in field '{key}'")
+                count += 1
+                yield item
+            if count:
+                return
+            fields[key] = []
+        else:
+            fields[key] = buf.decode()
+    buf.pos += 1
+    yield fields
+
+def _is_jsonl(json_path, max_line=64 * CHUNK_SIZE):
+    """Guess newline-delimited JSON: the first line is a complete object and more follows"""
+    if strip_compression(json_path).endswith((".jsonl", ".ndjson")):
+        return True
+    with open_text(json_path) as f:
+        first_line = f.readline(max_line)
+        if not first_line.lstrip().startswith("{") or not first_line.endswith("\n"):
+            return False
+        try:
+            json.loads(first_line)
+        except json.JSONDecodeError:
+            return False
+        return any(line.strip() for line in f)
+
+def _iter_parquet(path, batch_rows=65536):
+    """Yield records from a Parquet file, memory-mapped and read one record batch at a time"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading .parquet files requires the pyarrow package (pip install pyarrow)")
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    for batch in parquet_file.iter_batches(batch_size=batch_rows):
+        yield from batch.to_pylist()
+
+def iter_etds(json_path, chunk_size=CHUNK_SIZE):
+    """
+    Yield ETD records one at a time without loading the whole file.
+
+    Accepts a top-level JSON array, an object wrapping an array field,
+    a single object, or newline-delimited JSON (JSONL), optionally
+    compressed with gzip (.gz) or zstd (.zst), as well as the Parquet
+    files written by CSVtoJSON.py.
+    """
+    if json_path.endswith(".parquet"):
+        yield from _iter_parquet(json_path)
+        return
+
+    if _is_jsonl(json_path):
+        with open_text(json_path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    with open_text(json_path) as f:
+        buf = _Buffer(f, chunk_size)
+        first_char = buf.peek()
+        if first_char == "[":
+            yield from _iter_array(buf)
+        elif first_char == "{":
+            yield from _iter_object(buf)
+        elif first_char:
+            # Unexpected format, try a single value
+            yield buf.decode()
+
+def iter_batches(records, batch_size):
+    """Group an iterable of records into lists of at most batch_size"""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
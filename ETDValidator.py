@@ -0,0 +1,164 @@
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import tempfile
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+def normalize_title(title):
+    """Casefold a title and drop punctuation and repeated whitespace"""
+    return " ".join(_PUNCTUATION.sub(" ", title.casefold()).split())
+
+def key_digest(key):
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 16-byte digests"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+        self.num_bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, digest):
+        # Double hashing from the two halves of the digest
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def might_contain(self, digest):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+    def add(self, digest):
+        for pos in self._positions(digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+class DuplicateIndex:
+    """
+    Exact set of key digests with bounded memory.
+
+    The most recent keys are held in a set and spilled to a temporary
+    SQLite file when it fills up. A Bloom filter in front means only
+    likely duplicates (true ones plus ~1% false positives) are looked up
+    on disk.
+    """
+
+    def __init__(self, capacity, max_memory_keys=500000, spill_dir=None):
+        self.bloom = BloomFilter(capacity)
+        self.recent = set()
+        self.max_memory_keys = max_memory_keys
+        self.spill_dir = spill_dir
+        self.spilled = 0
+        self.disk_lookups = 0
+        self._db = None
+        self._db_path = None
+
+    def __contains__(self, digest):
+        if not self.bloom.might_contain(digest):
+            return False
+        if digest in self.recent:
+            return True
+        if self._db is None:
+            return False
+        self.disk_lookups += 1
+        return self._db.execute("SELECT 1 FROM keys WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def add(self, digest):
+        self.bloom.add(digest)
+        self.recent.add(digest)
+        if len(self.recent) >= self.max_memory_keys:
+            self._spill()
+
+    def _spill(self):
+        if self._db is None:
+            fd, self._db_path = tempfile.mkstemp(suffix=".sqlite", dir=self.spill_dir)
+            os.close(fd)
+            self._db = sqlite3.connect(self._db_path)
+            # Scratch data, so skip the journal and fsyncs
+            self._db.execute("PRAGMA journal_mode = OFF")
+            self._db.execute("PRAGMA synchronous = OFF")
+            self._db.execute("CREATE TABLE keys (digest BLOB PRIMARY KEY) WITHOUT ROWID")
+        self._db.executemany("INSERT OR IGNORE INTO keys VALUES (?)", ((digest,) for digest in self.recent))
+        self._db.commit()
+        self.spilled += len(self.recent)
+        self.recent.clear()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            os.remove(self._db_path)
+            self._db = None
+
+REJECT_REASONS = ["missing_title", "duplicate_id", "duplicate_uri", "duplicate_title"]
+
+class ETDValidator:
+    """
+    Validation stage for cleaned ETD rows before they are written out.
+
+    Rejects rows without a title (the loaders key Titles on it) and rows
+    repeating an earlier row's id, URI or normalized title, so records
+    never silently collapse into one node in the database. The first row
+    with a key wins; rejected rows go to a JSONL rejects file with the
+    reason.
+    """
+
+    def __init__(self, rejects_path, expected_rows=1000000, max_memory_keys=500000, spill_dir=None):
+        self.rejects_path = rejects_path
+        self.indexes = {
+            name: DuplicateIndex(expected_rows, max_memory_keys, spill_dir)
+            for name in ("id", "uri", "title")
+        }
+        self.counts = {"checked": 0, "accepted": 0}
+        self.counts.update((reason, 0) for reason in REJECT_REASONS)
+        self._rejects = open(rejects_path, "w", encoding="utf-8")
+
+    def _keys(self, row):
+        keys = {"id": row["id"], "uri": row["URI"], "title": normalize_title(row["title"])}
+        return {name: key_digest(value) for name, value in keys.items() if value}
+
+    def accept(self, row):
+        """Return True if the row is valid, otherwise record it as rejected"""
+        self.counts["checked"] += 1
+        reason = None
+        digests = {}
+        if not row["title"]:
+            reason = "missing_title"
+        else:
+            digests = self._keys(row)
+            for name, digest in digests.items():
+                if digest in self.indexes[name]:
+                    reason = f"duplicate_{name}"
+                    break
+
+        if reason is not None:
+            self.counts[reason] += 1
+            self._rejects.write(json.dumps({"reason": reason, "row": self.counts["checked"], "record": row},
+                                           ensure_ascii=False) + "\n")
+            return False
+
+        # Only accepted rows claim their keys
+        for name, digest in digests.items():
+            self.indexes[name].add(digest)
+        self.counts["accepted"] += 1
+        return True
+
+    def close(self):
+        self._rejects.close()
+        for index in self.indexes.values():
+            index.close()
+
+    def report(self):
+        counts = self.counts
+        rejected = counts["checked"] - counts["accepted"]
+        details = ", ".join(f"{counts[reason]} {reason}" for reason in REJECT_REASONS)
+        print(f"Validation: {counts['accepted']} of {counts['checked']} rows accepted, {rejected} rejected ({details})")
+        spilled = sum(index.spilled for index in self.indexes.values())
+        if spilled:
+            lookups = sum(index.disk_lookups for index in self.indexes.values())
+            print(f"Duplicate check spilled {spilled} keys to disk, {lookups} disk lookups")
+        if rejected:
+            print(f"Rejected rows written to {self.rejects_path}")
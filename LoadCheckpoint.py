@@ -0,0 +1,123 @@
+import json
+import os
+import threading
+
+def _to_ranges(numbers):
+    """Compress a set of batch numbers into [start, end] ranges"""
+    ranges = []
+    for n in sorted(numbers):
+        if ranges and n == ranges[-1][1] + 1:
+            ranges[-1][1] = n
+        else:
+            ranges.append([n, n])
+    return ranges
+
+def _from_ranges(ranges):
+    numbers = set()
+    for start, end in ranges:
+        numbers.update(range(start, end + 1))
+    return numbers
+
+def default_checkpoint_path(data_path):
+    return f"{data_path}.checkpoint.json"
+
+def source_params(data_path):
+    """
+    Identify an input file for a checkpoint by path, size and modification
+    time, so an export regenerated at the same path starts a new load
+    """
+    stat = os.stat(data_path)
+    return {"source": os.path.abspath(data_path), "source_size": stat.st_size,
+            "source_mtime_ns": stat.st_mtime_ns}
+
+class LoadCheckpoint:
+    """
+    Record of which batches of a load were committed or failed, saved as
+    JSON after every batch so an interrupted load can be resumed.
+
+    Batch numbers are only meaningful for the same input file contents
+    and batch settings, so those are stored alongside and checked on
+    resume.
+    """
+
+    def __init__(self, path, params):
+        self.path = path
+        self.params = params
+        self.committed = set()
+        self.failed = set()
+        self.records = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path, params, resume=False):
+        """
+        Start a new checkpoint, or load the existing one when resuming.
+
+        Raises ValueError if the saved checkpoint was made with different
+        parameters.
+        """
+        checkpoint = cls(path, params)
+        if not resume:
+            return checkpoint
+
+        if not os.path.exists(path):
+            print(f"No checkpoint found at {path}, starting from the beginning")
+            return checkpoint
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("params") != params:
+            raise ValueError(
+                f"Checkpoint {path} was written with {data.get('params')}, "
+                f"not {params}; rerun without --resume"
+            )
+
+        checkpoint.committed = _from_ranges(data.get("committed", []))
+        checkpoint.failed = set(data.get("failed", []))
+        checkpoint.records = data.get("records", 0)
+        print(f"Resuming from {path}: {len(checkpoint.committed)} batches "
+              f"({checkpoint.records} records) already committed, "
+              f"first uncommitted batch is {checkpoint.first_uncommitted()}")
+        return checkpoint
+
+    def is_committed(self, batch_num):
+        return batch_num in self.committed
+
+    def first_uncommitted(self):
+        batch_num = 1
+        while batch_num in self.committed:
+            batch_num += 1
+        return batch_num
+
+    def mark_committed(self, batch_num, count):
+        with self._lock:
+            self.committed.add(batch_num)
+            self.failed.discard(batch_num)
+            self.records += count
+            self._save()
+
+    def mark_failed(self, batch_num, count=0):
+        with self._lock:
+            # A committed batch can still fail a later check, e.g. a read-back
+            if batch_num in self.committed:
+                self.committed.discard(batch_num)
+                self.records -= count
+            self.failed.add(batch_num)
+            self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        data = {
+            "params": self.params,
+            "committed": _to_ranges(self.committed),
+            "failed": sorted(self.failed),
+            "records": self.records,
+        }
+        # Write then rename so a crash never leaves a truncated checkpoint
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
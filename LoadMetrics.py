@@ -0,0 +1,203 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300]
+BYTES_BUCKETS = [16 << 10, 64 << 10, 256 << 10, 1 << 20, 4 << 20, 16 << 20, 64 << 20]
+
+# Bucket bounds by histogram name; anything else is a latency in seconds
+HISTOGRAM_BUCKETS = {"request_bytes": BYTES_BUCKETS}
+
+EXPORT_INTERVAL = 15  # seconds between Prometheus file updates during a load
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return round(sorted_values[rank], 4)
+
+def _bound_label(bound):
+    return "+Inf" if bound == float("inf") else str(bound)
+
+class Histogram:
+    """Fixed-bucket histogram with the cumulative counts Prometheus expects"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(upper bound, observations <= bound), ...] ending with +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + [float("inf")], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "buckets": {_bound_label(bound): count for bound, count in self.cumulative()},
+        }
+
+class LoadMetrics:
+    """
+    Stage timings, counters, per-batch latencies and request histograms
+    for one load run, summarised as a machine-readable JSON report or a
+    Prometheus text file.
+
+    Batches may be recorded from worker threads. In parallel loads the
+    stages overlap, so stage times do not add up to the total.
+    """
+
+    def __init__(self, loader, source):
+        self.loader = loader
+        self.source = source
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.batch_latencies = []
+        self.histograms = {}
+        self._last_export = self._start
+        self._lock = threading.Lock()
+
+    def add_stage_time(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, time.perf_counter() - start)
+
+    def timed(self, iterable, name):
+        """Yield from iterable, charging the time spent producing items to a stage"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_stage_time(name, time.perf_counter() - start)
+                return
+            self.add_stage_time(name, time.perf_counter() - start)
+            yield item
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(HISTOGRAM_BUCKETS.get(name, LATENCY_BUCKETS))
+            histogram.observe(value)
+
+    def record_batch(self, latency, records, ok=True):
+        with self._lock:
+            self.batch_latencies.append(latency)
+        self.observe("batch_latency_seconds", latency)
+        self.count("batches_committed" if ok else "batches_failed")
+        if ok:
+            self.count("records_loaded", records)
+
+    def record_request(self, latency, status):
+        """One HTTP request attempt: round trip time and status code, or the exception name if it raised"""
+        self.observe("request_latency_seconds", latency)
+        self.count(f"status_{status}")
+        self.count("requests")
+
+    def summary(self, **extra):
+        elapsed = time.perf_counter() - self._start
+        latencies = sorted(self.batch_latencies)
+        loaded = self.counters.get("records_loaded", 0)
+        report = {
+            "loader": self.loader,
+            "source": self.source,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "elapsed_seconds": round(elapsed, 3),
+            "records_per_second": round(loaded / elapsed, 2) if elapsed > 0 else None,
+            "stages_seconds": {name: round(seconds, 3) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+            "batch_latency_seconds": {
+                "count": len(latencies),
+                "p50": percentile(latencies, 50),
+                "p90": percentile(latencies, 90),
+                "p99": percentile(latencies, 99),
+                "max": round(latencies[-1], 4) if latencies else None,
+            },
+            "histograms": {name: histogram.summary() for name, histogram in self.histograms.items()},
+        }
+        report.update(extra)
+        return report
+
+    def write_json(self, path, **extra):
+        """Write the summary to path and return it"""
+        report = self.summary(**extra)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, path)
+        return report
+
+    def write_prometheus(self, path):
+        """
+        Write counters, stage times and histograms in the Prometheus text
+        exposition format, e.g. for the node_exporter textfile collector
+        """
+        labels = f'loader="{self.loader}"'
+        lines = []
+        with self._lock:
+            lines.append("# TYPE etd_load_elapsed_seconds gauge")
+            lines.append(f"etd_load_elapsed_seconds{{{labels}}} {time.perf_counter() - self._start:.3f}")
+            statuses = []
+            for name, value in sorted(self.counters.items()):
+                if name.startswith("status_"):
+                    statuses.append((name[len("status_"):], value))
+                    continue
+                lines.append(f"# TYPE etd_load_{name}_total counter")
+                lines.append(f"etd_load_{name}_total{{{labels}}} {value}")
+            if statuses:
+                lines.append("# TYPE etd_load_responses_total counter")
+                for status, value in statuses:
+                    lines.append(f'etd_load_responses_total{{{labels},status="{status}"}} {value}')
+            lines.append("# TYPE etd_load_stage_seconds gauge")
+            for stage, seconds in sorted(self.stages.items()):
+                lines.append(f'etd_load_stage_seconds{{{labels},stage="{stage}"}} {seconds:.3f}')
+            for name, histogram in sorted(self.histograms.items()):
+                lines.append(f"# TYPE etd_load_{name} histogram")
+                for bound, count in histogram.cumulative():
+                    lines.append(f'etd_load_{name}_bucket{{{labels},le="{_bound_label(bound)}"}} {count}')
+                lines.append(f"etd_load_{name}_sum{{{labels}}} {histogram.sum:.4f}")
+                lines.append(f"etd_load_{name}_count{{{labels}}} {histogram.count}")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+    def write_prometheus_every(self, path, interval=EXPORT_INTERVAL):
+        """Rewrite the Prometheus file if interval seconds have passed since the last write"""
+        now = time.perf_counter()
+        with self._lock:
+            if now - self._last_export < interval:
+                return
+            self._last_export = now
+        self.write_prometheus(path)
@@ -147,11 +147,13 @@ def get_etd_metadata(iri):
             if discipline_result and discipline_result['discipline']:
                 metadata.append(f"discipline:{discipline_result['discipline']}")
                         
-            # Get Abstract
+            # Get Abstract (hash-keyed Abstract node, or stored on the Title)
             abstract_result = session.run(
                 """
-                MATCH (t:Title {uri: $iri})-[:HAS_ABSTRACT]->(a:Abstract)
-                RETURN a.text as abstract
+                MATCH (t:Title {uri: $iri})
+                OPTIONAL MATCH (t)-[:HAS_ABSTRACT]->(a:Abstract)
+                RETURN coalesce(a.text, t.abstract) as abstract
+                LIMIT 1
                 """,
                 iri=iri
             ).single()
@@ -198,8 +200,10 @@ def search_etds_by_keyword(keyword, limit=100, pred="title"):
             """
         elif pred == "abstract":
             query = """
-            MATCH (t:Title)-[:HAS_ABSTRACT]->(a:Abstract)
-            WHERE toLower(a.text) CONTAINS toLower($kw)
+            MATCH (t:Title)
+            OPTIONAL MATCH (t)-[:HAS_ABSTRACT]->(a:Abstract)
+            WITH t, coalesce(a.text, t.abstract) AS abstract
+            WHERE toLower(abstract) CONTAINS toLower($kw)
             RETURN t.uri AS s, t.value AS title
             LIMIT $limit
             """
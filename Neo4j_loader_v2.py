@@ -1,12 +1,218 @@
 from neo4j import GraphDatabase
-import json
 import time
 import sys
 import re
+import os
+import queue
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from ETDStream import iter_etds, iter_batches
+from LoadCheckpoint import LoadCheckpoint, default_checkpoint_path, source_params
+from DeltaManifest import DeltaManifest, record_hash
+from ETDSchema import DIMENSIONS, abstract_key
+from LoadMetrics import LoadMetrics
 
 # Connect to Neo4j 
 driver = GraphDatabase.driver("bolt://localhost:7687")
 
+verbosity = 1  # 0: summary only, 1: errors, 2: also every batch and skipped record
+
+def log(message, level=2):
+    """Print a message if verbosity is at least level"""
+    if verbosity >= level:
+        print(message)
+
+# Batched write queries; each takes a $rows parameter list
+TITLE_QUERY = """
+    UNWIND $rows AS row
+    MERGE (t:Title {value: row.title})
+    SET t.id = CASE row.id WHEN '' THEN null ELSE row.id END,
+        t.uri = row.uri,
+        t.hash = row.hash,
+        t.abstract = row.title_abstract
+"""
+
+# Delta loads replace changed or removed ETDs by their Title value, the
+# key Titles are MERGEd on (ids are reused across titles), along with
+# their now orphaned Abstract
+DELETE_TITLES_QUERY = """
+    UNWIND $titles AS title
+    MATCH (t:Title {value: title})
+    OPTIONAL MATCH (t)-[:HAS_ABSTRACT]->(abs:Abstract)
+    DETACH DELETE t
+    WITH DISTINCT abs
+    WHERE abs IS NOT NULL AND NOT (abs)--()
+    DELETE abs
+"""
+
+# Shared dimension nodes (everything but the per-Title Abstract) are
+# interned by element id during a run, and are created up front by the
+# parallel load
+SHARED_FIELDS = [field for field, _, _, _ in DIMENSIONS if field != "abstract"]
+
+def _returning(field):
+    """RETURN clause handing back element ids of cacheable dimension nodes"""
+    if field in SHARED_FIELDS:
+        return "RETURN DISTINCT row.value AS value, elementId(n) AS eid"
+    return ""
+
+DIMENSION_QUERIES = {
+    field: f"""
+    UNWIND $rows AS row
+    MERGE (n:{label} {{{key}: row.value}})
+    WITH n, row
+    MATCH (t:Title {{value: row.title}})
+    MERGE (t)-[:{rel}]->(n)
+    {_returning(field)}
+"""
+    for field, label, key, rel in DIMENSIONS
+}
+
+# Abstracts are upserted on their digest; the text is only set on create
+DIMENSION_QUERIES["abstract"] = """
+    UNWIND $rows AS row
+    MERGE (n:Abstract {hash: row.value})
+    ON CREATE SET n.text = row.text
+    WITH n, row
+    MATCH (t:Title {value: row.title})
+    MERGE (t)-[:HAS_ABSTRACT]->(n)
+"""
+
+# Links to dimension nodes already in the cache skip the MERGE lookup
+CACHED_QUERIES = {
+    field: f"""
+    UNWIND $rows AS row
+    MATCH (n) WHERE elementId(n) = row.eid
+    MATCH (t:Title {{value: row.title}})
+    MERGE (t)-[:{rel}]->(n)
+"""
+    for field, _, _, rel in DIMENSIONS
+}
+
+# Uniqueness constraints back every MERGE key
+SCHEMA_CONSTRAINTS = [("Title", "value")] + [
+    (label, key) for _, label, key, _ in DIMENSIONS
+]
+
+# Plain lookup indexes for properties that are matched but not unique.
+# ETD dumps reuse ids across different titles, and a unique id would make
+# the whole batch holding a repeat fail, so ids are only indexed
+SCHEMA_INDEXES = [("Title", "id"), ("Title", "uri")]
+
+def create_schema(timeout=300):
+    """
+    Create the constraints and indexes the loader and queries rely on,
+    wait for them to come online and report what exists.
+    """
+    try:
+        with driver.session() as session:
+            for label, key in SCHEMA_CONSTRAINTS:
+                session.run(
+                    f"CREATE CONSTRAINT {label.lower()}_{key}_unique IF NOT EXISTS "
+                    f"FOR (n:{label}) REQUIRE n.{key} IS UNIQUE"
+                ).consume()
+            for label, key in SCHEMA_INDEXES:
+                session.run(
+                    f"CREATE INDEX {label.lower()}_{key}_index IF NOT EXISTS "
+                    f"FOR (n:{label}) ON (n.{key})"
+                ).consume()
+
+            # Block until every index (including constraint-backed ones) is ONLINE
+            session.run("CALL db.awaitIndexes($timeout)", timeout=timeout).consume()
+
+            indexes = session.run("""
+                SHOW INDEXES YIELD name, labelsOrTypes, properties, state, owningConstraint
+                WHERE labelsOrTypes IS NOT NULL
+                RETURN name, labelsOrTypes, properties, state, owningConstraint
+                ORDER BY name
+            """).data()
+
+        print("Schema:")
+        for index in indexes:
+            kind = "constraint" if index["owningConstraint"] else "index"
+            labels = ",".join(index["labelsOrTypes"])
+            props = ",".join(index["properties"])
+            print(f"- {index['name']} ({kind} on {labels}.{props}): {index['state']}")
+
+        offline = [index["name"] for index in indexes if index["state"] != "ONLINE"]
+        if offline:
+            print(f"WARNING: Indexes not online: {offline}")
+            return False
+        return True
+    except Exception as e:
+        print(f"Error creating schema: {e}")
+        return False
+
+# Parallel load: phase 1 creates the shared dimension nodes once, phase 2
+# only MATCHes them. Abstracts are per-Title, so they are still MERGEd in
+# phase 2.
+NODE_QUERIES = {
+    field: f"""
+    UNWIND $values AS value
+    MERGE (n:{label} {{{key}: value}})
+    RETURN value, elementId(n) AS eid
+"""
+    for field, label, key, _ in DIMENSIONS
+}
+
+LINK_QUERIES = {
+    field: f"""
+    UNWIND $rows AS row
+    MATCH (t:Title {{value: row.title}})
+    MATCH (n:{label} {{{key}: row.value}})
+    MERGE (t)-[:{rel}]->(n)
+    {_returning(field)}
+"""
+    for field, label, key, rel in DIMENSIONS
+}
+LINK_QUERIES["abstract"] = DIMENSION_QUERIES["abstract"]
+
+class DimensionCache:
+    """
+    Element ids of the shared dimension nodes written in this run, so
+    later records link to them directly instead of MERGEing by key.
+
+    Each label keeps at most max_size entries and evicts the least
+    recently used, which bounds memory for high-cardinality labels like
+    Author and Advisor. Entries are only added once the transaction that
+    created the node has committed.
+    """
+
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self.entries = {field: OrderedDict() for field in SHARED_FIELDS}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, field, value):
+        with self._lock:
+            entries = self.entries[field]
+            eid = entries.get(value)
+            if eid is None:
+                self.misses += 1
+                return None
+            entries.move_to_end(value)
+            self.hits += 1
+            return eid
+
+    def add(self, field, items):
+        with self._lock:
+            entries = self.entries[field]
+            for value, eid in items:
+                entries[value] = eid
+                entries.move_to_end(value)
+            while len(entries) > self.max_size:
+                entries.popitem(last=False)
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        sizes = sum(len(entries) for entries in self.entries.values())
+        print(f"Dimension cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate), {sizes} entries")
+
 def check_neo4j_version():
     try:
         with driver.session() as session:
@@ -27,28 +233,41 @@ def clear_database():
         return False
     return True
 
+# Node counts per label and relationship counts per type in one round
+# trip; each branch is answered from the count store
+VERIFY_QUERY = "\nUNION ALL\n".join(
+    [f"MATCH (n:{label}) RETURN 'nodes' AS kind, '{label}' AS name, count(n) AS count"
+     for label in ["Title"] + [label for _, label, _, _ in DIMENSIONS]]
+    + [f"MATCH ()-[r:{rel}]->() RETURN 'relationships' AS kind, '{rel}' AS name, count(r) AS count"
+       for _, _, _, rel in DIMENSIONS]
+)
+
 def verify_load():
+    """
+    Count nodes per label and relationships per type.
+
+    Returns {"nodes": {...}, "relationships": {...}}, or None on error.
+    """
     try:
         with driver.session() as session:
-            # Check Title nodes
-            title_count = session.run("MATCH (t:Title) RETURN count(t) as count").single()["count"]
-            
-            # These checks may return 0 if no relationships exist yet
-            advisor_rel = session.run("MATCH ()-[r:HAS_ADVISOR]->() RETURN count(r) as count").single()["count"]
-            year_rel = session.run("MATCH ()-[r:PUBLISHED_IN]->() RETURN count(r) as count").single()["count"]
-            
-            print(f"\nVerification results:")
-            print(f"- Title nodes: {title_count}")
-            print(f"- HAS_ADVISOR relationships: {advisor_rel}")
-            print(f"- PUBLISHED_IN relationships: {year_rel}")
-            
-            if title_count == 0:
-                print("WARNING: No Title nodes were loaded!")
-                return False
-            return True
+            records = session.run(VERIFY_QUERY).data()
+
+        counts = {"nodes": {}, "relationships": {}}
+        for record in records:
+            counts[record["kind"]][record["name"]] = record["count"]
+
+        print(f"\nVerification results:")
+        for label, count in counts["nodes"].items():
+            print(f"- {label} nodes: {count}")
+        for rel, count in counts["relationships"].items():
+            print(f"- {rel} relationships: {count}")
+
+        if counts["nodes"].get("Title", 0) == 0:
+            print("WARNING: No Title nodes were loaded!")
+        return counts
     except Exception as e:
         print(f"Error verifying data: {e}")
-        return False
+        return None
 
 def clean_id_field(value):
     """Clean ID field by removing <id> tags and extracting correct ID"""
@@ -67,7 +286,276 @@ def clean_id_field(value):
     # Otherwise return as is
     return str(value)
 
-def load_etds_from_json(json_path):
+def prepare_etd(etd):
+    """Extract the loader's fields from a raw ETD record.
+
+    Returns None when the record has no usable title.
+    """
+    # Use the 'id' field directly (not <id>)
+    title = etd.get("title", "Unknown Title")
+    if not title or title == "Unknown Title":
+        return None
+
+    row = {
+        "id": etd.get("id", ""),
+        "title": title,
+        "uri": etd.get("URI", etd.get("uri", "")),
+    }
+    for field, _, _, _ in DIMENSIONS:
+        row[field] = etd.get(field, "")
+    row["hash"] = record_hash(row)
+    return row
+
+def iter_rows(json_path, stats=None, delta=None, abstract_mode="node"):
+    """
+    Yield prepared rows for every ETD in the file with a usable title.
+
+    Skipped records are reported and counted in stats["skipped"] when a
+    stats dict is given. With a delta manifest only new or changed rows
+    are yielded, matched on their title, and changed rows are flagged
+    for replacement. With abstract_mode "title" the abstract is stored on
+    the Title node instead of a separate Abstract node.
+    """
+    rows = _iter_prepared(json_path, stats)
+    if delta is not None:
+        rows = _iter_delta(rows, delta, count=stats is not None)
+    for row in rows:
+        if abstract_mode == "title":
+            row["title_abstract"] = row["abstract"] or None
+            row["abstract"] = ""
+        yield row
+
+def _iter_delta(rows, delta, count):
+    for row, status in delta.filter(rows, lambda row: (row["title"], row["hash"]), count=count):
+        row["changed"] = status == "changed"
+        yield row
+
+def _iter_prepared(json_path, stats):
+    for i, etd in enumerate(iter_etds(json_path)):
+        row = prepare_etd(etd)
+
+        # Skip records with empty titles
+        if row is None:
+            if stats is not None:
+                log(f"Skipping record {i+1} with missing title")
+                stats["skipped"] += 1
+            continue
+        yield row
+
+def write_batch(tx, rows, queries=DIMENSION_QUERIES, cache=None):
+    """
+    Write a batch of prepared ETD rows inside an open transaction.
+
+    Returns (field, [(value, element id), ...]) for dimension nodes that
+    were not cached yet, to be added to the cache after commit.
+    """
+    # Changed ETDs are rewritten from scratch so stale relationships go away
+    replaced = [row["title"] for row in rows if row.get("changed")]
+    if replaced:
+        tx.run(DELETE_TITLES_QUERY, titles=replaced)
+
+    tx.run(TITLE_QUERY, rows=rows)
+
+    # One UNWIND per dimension, only shipping rows that have a value
+    new_entries = []
+    for field, _, _, _ in DIMENSIONS:
+        if field == "abstract":
+            pairs = [{"title": row["title"], "value": abstract_key(row[field]), "text": row[field]}
+                     for row in rows if row[field]]
+        else:
+            pairs = [{"title": row["title"], "value": row[field]} for row in rows if row[field]]
+        if not pairs:
+            continue
+        if cache is None or field not in cache.entries:
+            tx.run(queries[field], rows=pairs).consume()
+            continue
+
+        cached = []
+        uncached = []
+        for pair in pairs:
+            eid = cache.get(field, pair["value"])
+            if eid is None:
+                uncached.append(pair)
+            else:
+                cached.append({"title": pair["title"], "eid": eid})
+        if cached:
+            tx.run(CACHED_QUERIES[field], rows=cached).consume()
+        if uncached:
+            result = tx.run(queries[field], rows=uncached)
+            new_entries.append((field, [(record["value"], record["eid"]) for record in result]))
+    return new_entries
+
+def load_batch(session, rows, batch_num=None, cache=None):
+    """
+    Write one batch in a single explicit transaction.
+
+    The transaction is committed if every statement succeeds and rolled
+    back otherwise, so a batch is either fully loaded or not at all.
+    """
+    try:
+        with session.begin_transaction() as tx:
+            new_entries = write_batch(tx, rows, DIMENSION_QUERIES, cache)
+            tx.commit()
+        if cache is not None:
+            for field, items in new_entries:
+                cache.add(field, items)
+        return True
+    except Exception as e:
+        log(f"Error loading batch {batch_num} ({len(rows)} ETDs), rolled back: {e}", 1)
+        return False
+
+def _run_write(tx, query, **params):
+    tx.run(query, **params).consume()
+
+def _run_interning(tx, query, **params):
+    return [(record["value"], record["eid"]) for record in tx.run(query, **params)]
+
+def load_manifest_from_graph(delta):
+    """Seed an empty delta manifest from the hashes stored on Title nodes"""
+    with driver.session() as session:
+        result = session.run("MATCH (t:Title) WHERE t.hash IS NOT NULL RETURN t.value AS title, t.hash AS hash")
+        delta.commit((record["title"], record["hash"]) for record in result)
+    print(f"Seeded delta manifest from {len(delta.hashes)} Title hashes in Neo4j")
+
+def delete_missing_etds(delta, batch_size):
+    """Delete ETDs that are in the manifest but no longer in the source"""
+    missing = delta.missing()
+    with driver.session() as session:
+        for chunk in iter_batches(missing, batch_size):
+            session.execute_write(_run_write, DELETE_TITLES_QUERY, titles=chunk)
+            delta.remove(chunk)
+    print(f"Deleted {len(missing)} ETDs no longer in the source")
+
+def create_dimension_nodes(json_path, batch_size, delta=None, cache=None):
+    """
+    Parallel phase 1: create every distinct shared dimension node once.
+
+    Doing this up front from a single session means the phase 2 workers
+    only MATCH hot nodes like a shared Year or University instead of
+    racing to MERGE them.
+    """
+    distinct = {field: set() for field in SHARED_FIELDS}
+    for row in iter_rows(json_path, delta=delta):
+        for field in SHARED_FIELDS:
+            if row[field]:
+                distinct[field].add(row[field])
+
+    with driver.session() as session:
+        for field in SHARED_FIELDS:
+            for chunk in iter_batches(distinct[field], batch_size):
+                items = session.execute_write(_run_interning, NODE_QUERIES[field], values=chunk)
+                if cache is not None:
+                    cache.add(field, items)
+
+    counts = ", ".join(f"{field}={len(values)}" for field, values in distinct.items())
+    print(f"Created dimension nodes: {counts}")
+
+def _partition_worker(work_queue, checkpoint, delta, cache, metrics):
+    """
+    Parallel phase 2 worker: write Title nodes and relationships for the
+    batches routed to this partition, each in its own session.
+
+    execute_write retries transient errors such as deadlocks and leader
+    switches before giving up on a batch.
+    """
+    loaded = 0
+    failed_batches = []
+    session = None
+    try:
+        session = driver.session()
+    except Exception as e:
+        print(f"Error opening worker session: {e}")
+
+    while True:
+        item = work_queue.get()
+        if item is None:
+            break
+        batch_num, rows = item
+        if session is None:
+            failed_batches.append(batch_num)
+            checkpoint.mark_failed(batch_num)
+            continue
+        batch_start = time.perf_counter()
+        try:
+            new_entries = session.execute_write(write_batch, rows, LINK_QUERIES, cache)
+            latency = time.perf_counter() - batch_start
+            metrics.record_batch(latency, len(rows))
+            log(f"Batch {batch_num}: {len(rows)} ETDs committed in {latency:.3f} seconds")
+            if cache is not None:
+                for field, items in new_entries:
+                    cache.add(field, items)
+            loaded += len(rows)
+            checkpoint.mark_committed(batch_num, len(rows))
+            if delta is not None:
+                delta.commit((row["title"], row["hash"]) for row in rows)
+        except Exception as e:
+            log(f"Error loading batch {batch_num} ({len(rows)} ETDs), rolled back: {e}", 1)
+            metrics.record_batch(time.perf_counter() - batch_start, len(rows), ok=False)
+            failed_batches.append(batch_num)
+            checkpoint.mark_failed(batch_num)
+
+    if session is not None:
+        session.close()
+    return loaded, failed_batches
+
+def load_parallel(json_path, batch_size, workers, stats, checkpoint, metrics, delta=None, cache=None,
+                  abstract_mode="node", prometheus_path=None):
+    """
+    Two-phase parallel load.
+
+    Phase 1 creates the shared dimension nodes. Phase 2 partitions Titles
+    by a hash of their value across the worker pool, so a given Title is
+    always written by the same worker, and each worker commits its own
+    batches. Work queues are bounded to keep memory flat. Batches already
+    recorded in the checkpoint are not sent again.
+
+    Returns (loaded, batch count, failed batch numbers).
+    """
+    with metrics.stage("dimension_nodes"):
+        create_dimension_nodes(json_path, batch_size, delta, cache)
+
+    phase_start = time.perf_counter()
+    queues = [queue.Queue(maxsize=2) for _ in range(workers)]
+    pending = [[] for _ in range(workers)]
+    batch_num = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_partition_worker, q, checkpoint, delta, cache, metrics) for q in queues]
+        try:
+            for row in metrics.timed(iter_rows(json_path, stats, delta, abstract_mode), "parse"):
+                partition = zlib.crc32(row["title"].encode("utf-8")) % workers
+                pending[partition].append(row)
+                if len(pending[partition]) >= batch_size:
+                    batch_num += 1
+                    if not checkpoint.is_committed(batch_num):
+                        queues[partition].put((batch_num, pending[partition]))
+                    pending[partition] = []
+                    if prometheus_path:
+                        metrics.write_prometheus_every(prometheus_path)
+
+            # Flush the final partial batch of each partition
+            for partition, rows in enumerate(pending):
+                if rows:
+                    batch_num += 1
+                    if not checkpoint.is_committed(batch_num):
+                        queues[partition].put((batch_num, rows))
+        finally:
+            for q in queues:
+                q.put(None)
+
+        loaded = 0
+        failed_batches = []
+        for future in futures:
+            worker_loaded, worker_failed = future.result()
+            loaded += worker_loaded
+            failed_batches.extend(worker_failed)
+
+    metrics.add_stage_time("relationships", time.perf_counter() - phase_start)
+    return loaded, batch_num, sorted(failed_batches)
+
+def load_etds_from_json(json_path, batch_size=1000, workers=1, resume=False, checkpoint_path=None,
+                        delta_path=None, delete_missing=False, cache_size=100000, abstract_mode="node",
+                        report_path=None, prometheus_path=None):
     # Test connection first
     try:
         with driver.session() as session:
@@ -82,221 +570,180 @@ def load_etds_from_json(json_path):
         print(f"Error connecting to Neo4j: {e}")
         return False
     
+    # A delta load only writes records whose hash differs from the manifest
+    delta = None
+    if delta_path:
+        if resume:
+            print("Error: --resume cannot be combined with --delta; rerun the delta load instead")
+            return False
+        try:
+            delta = DeltaManifest.open(delta_path)
+            if not delta.hashes:
+                load_manifest_from_graph(delta)
+        except Exception as e:
+            print(f"Error reading delta manifest: {e}")
+            return False
+
+    # Committed batches are recorded as they land so a failed run can resume
+    if checkpoint_path is None:
+        checkpoint_path = default_checkpoint_path(json_path)
+    try:
+        params = {**source_params(json_path), "batch_size": batch_size, "workers": workers}
+        checkpoint = LoadCheckpoint.open(checkpoint_path, params, resume)
+    except (OSError, ValueError) as e:
+        print(f"Error reading checkpoint: {e}")
+        return False
+
+    # Intern shared dimension nodes for the rest of this run
+    cache = DimensionCache(cache_size) if cache_size > 0 else None
+
     # Start the timer
     start_time = time.time()
+    metrics = LoadMetrics("neo4j", os.path.abspath(json_path))
     
-    # Load ETDs from JSON
+    # Stream ETDs from JSON straight into the batched write path, so only
+    # one batch of records is held in memory at a time
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            # Try to determine if it's an array or object
-            first_char = f.read(1).strip()
-            f.seek(0)  # Reset file pointer
-            
-            if first_char == '[':
-                # JSON array format
-                etds = json.load(f)
-            elif first_char == '{':
-                # JSON object format with items inside
-                data = json.load(f)
-                # Try to find an array field
-                if isinstance(data, dict):
-                    for key, value in data.items():
-                        if isinstance(value, list) and len(value) > 0:
-                            etds = value
-                            print(f"Found ETD array in field '{key}'")
-                            break
+        stats = {"skipped": 0}
+        if workers > 1:
+            loaded, batch_num, failed_batches = load_parallel(json_path, batch_size, workers, stats, checkpoint,
+                                                              metrics, delta, cache, abstract_mode, prometheus_path)
+        else:
+            loaded = 0
+            batch_num = 0
+            failed_batches = []
+            with driver.session() as session:
+                rows = iter_rows(json_path, stats, delta, abstract_mode)
+                batches = metrics.timed(iter_batches(rows, batch_size), "parse")
+                for batch_num, batch in enumerate(batches, 1):
+                    if checkpoint.is_committed(batch_num):
+                        continue
+                    batch_start = time.perf_counter()
+                    ok = load_batch(session, batch, batch_num, cache)
+                    latency = time.perf_counter() - batch_start
+                    metrics.record_batch(latency, len(batch), ok)
+                    metrics.add_stage_time("relationships", latency)
+                    if prometheus_path:
+                        metrics.write_prometheus_every(prometheus_path)
+                    if ok:
+                        log(f"Batch {batch_num}: {len(batch)} ETDs committed in {latency:.3f} seconds")
+                        loaded += len(batch)
+                        checkpoint.mark_committed(batch_num, len(batch))
+                        if delta is not None:
+                            delta.commit((row["title"], row["hash"]) for row in batch)
                     else:
-                        # If no array field, use the object itself
-                        etds = [data]
+                        failed_batches.append(batch_num)
+                        checkpoint.mark_failed(batch_num)
+
+        print(f"Loaded {loaded} ETDs from {json_path} in {batch_num} batches of up to {batch_size} ({stats['skipped']} skipped)")
+        if resume:
+            print(f"{checkpoint.records} ETDs committed in total across runs")
+        if cache is not None:
+            cache.report()
+        if delta is not None:
+            delta.report()
+            if delete_missing:
+                if failed_batches:
+                    print("Not deleting missing ETDs because some batches failed")
                 else:
-                    etds = [data]
+                    delete_missing_etds(delta, batch_size)
+        if failed_batches:
+            print(f"Failed batches (rolled back): {failed_batches}")
+            if delta is not None:
+                print("Rerun the delta load to retry them")
             else:
-                # Unexpected format, try direct load
-                etds = json.load(f)
-                if not isinstance(etds, list):
-                    etds = [etds]
-                    
-        # Sample data printing
-        print(f"Loaded {len(etds)} ETDs from {json_path}")
-        
-        # if etds:
-        #     print(f"Sample ETD format: {json.dumps(etds[0], indent=2)[:500]}...")
-        #     print(f"Available fields: {list(etds[0].keys())}")
-            
-    except Exception as e:
-        print(f"Error loading JSON file: {e}")
+                print(f"Rerun with --resume to retry them; progress is saved in {checkpoint_path}")
+
+        end_time = time.time()  # End the timer
+        elapsed_time = end_time - start_time
+        print(f"Completed loading ETDs into Neo4j in {elapsed_time:.2f} seconds")
+
+        with metrics.stage("verify"):
+            graph_counts = verify_load()
+
+        # Machine-readable report for tracking load throughput over time
+        metrics.counters["skipped_missing_title"] = stats["skipped"]
+        if report_path is None:
+            report_path = f"{json_path}.report.json"
+        extra = {
+            "params": {**params, "cache_size": cache_size, "abstract_mode": abstract_mode, "delta": bool(delta)},
+            "failed_batches": failed_batches,
+            "graph_counts": graph_counts,
+        }
+        if delta is not None:
+            extra["delta"] = delta.counts
+        if cache is not None:
+            extra["dimension_cache"] = {"hits": cache.hits, "misses": cache.misses}
+        report = metrics.write_json(report_path, **extra)
+        latency = report["batch_latency_seconds"]
+        print(f"Throughput: {report['records_per_second']} ETDs/sec, "
+              f"batch latency p50={latency['p50']} p99={latency['p99']} seconds")
+        print(f"Load report written to {report_path}")
+        if prometheus_path:
+            metrics.write_prometheus(prometheus_path)
+            print(f"Prometheus metrics written to {prometheus_path}")
+        return not failed_batches
+
+    except (OSError, ValueError) as e:
+        # ValueError covers json.JSONDecodeError and malformed structure
+        print(f"Error reading JSON file: {e}")
         print(f"Exception details: {type(e).__name__}")
         import traceback
         traceback.print_exc()
         return False
-    
-    # Load ETDs into Neo4j
-    try:
-        with driver.session() as session:
-            for i, etd in enumerate(etds):
-                # Extract properties - using dict.get() to handle missing fields
-                # Use the 'id' field directly (not <id>)
-                etd_id = etd.get("id", "")
-                title = etd.get("title", "Unknown Title")
-                uri = etd.get("URI", etd.get("uri", ""))
-                author = etd.get("author", "")
-                advisor = etd.get("advisor", "")
-                year = etd.get("year", "")
-                abstract = etd.get("abstract", "")
-                university = etd.get("university", "")
-                degree = etd.get("degree", "")
-                language = etd.get("language", "")
-                schooltype = etd.get("schooltype", "")
-                oadsclassifier = etd.get("oadsclassifier", "")
-                borndigital = etd.get("borndigital", "")
-                department = etd.get("department", "")
-                discipline = etd.get("discipline", "")
-                
-                # Skip records with empty titles
-                if not title or title == "Unknown Title":
-                    print(f"Skipping record {i+1} with missing title")
-                    continue
-                
-                # Create Title node with id and uri properties 
-                session.run("""
-                    MERGE (t:Title {value: $title})
-                    SET t.id = $id,
-                        t.uri = $uri
-                """, title=title, id=etd_id, uri=uri)
-                
-                # Create Author node and relationship
-                if author:
-                    session.run("""
-                        MERGE (a:Author {name: $author})
-                        WITH a
-                        MATCH (t:Title {value: $title})
-                        MERGE (t)-[:HAS_AUTHOR]->(a)
-                    """, author=author, title=title)
-                
-                # Create Advisor node and relationship
-                if advisor:
-                    session.run("""
-                        MERGE (adv:Advisor {name: $advisor})
-                        WITH adv
-                        MATCH (t:Title {value: $title})
-                        MERGE (t)-[:ACADEMIC_ADVISOR]->(adv)
-                    """, advisor=advisor, title=title)
-                
-                # Create Year node and relationship
-                if year:
-                    session.run("""
-                        MERGE (y:Year {value: $year})
-                        WITH y
-                        MATCH (t:Title {value: $title})
-                        MERGE (t)-[:PUBLISHED_IN]->(y)
-                    """, year=year, title=title)
-                
-                # Create Abstract node and relationship
-                if abstract:
-                    session.run("""
-                        MERGE (abs:Abstract {text: $abstract})
-                        WITH abs
-                        MATCH (t:Title {value: $title})
-                        MERGE (t)-[:HAS_ABSTRACT]->(abs)
-                    """, abstract=abstract, title=title)
-                
-                # Create University node and relationship
-                if university:
-                    session.run("""
-                        MERGE (u:University {name: $university})
-                        WITH u
-                        MATCH (t:Title {value: $title})
-                        MERGE (t)-[:PUBLISHED_BY]->(u)
-                    """, university=university, title=title)
-
-                # Create Department node and relationship
-                if department:
-                    session.run("""
-                        MERGE (d:Department {name: $department})
-                        WITH d
-                        MATCH (t:Title {value: $title})
-                        MERGE (t)-[:ACADEMIC_DEPARMENT]->(d)
-                    """, department=department, title=title)
-
-                # Create Discipline node and relationship
-                if discipline:
-                    session.run("""
-                        MERGE (dis:Discipline {name: $discipline})
-                        WITH dis
-                        MATCH (t:Title {value: $title})
-                        MERGE (t)-[:ACADEMIC_DISCIPLINE]->(dis)
-                    """, discipline=discipline, title=title)
-                    
-                # Create Degree node and relationship
-                if degree:
-                    session.run("""
-                        MERGE (deg:Degree {name: $degree})
-                        WITH deg
-                        MATCH (t:Title {value: $title})
-                        MERGE (t)-[:DEGREE_TYPE]->(deg)
-                    """, degree=degree, title=title)
-                
-                # Create Language node and relationship
-                if language:
-                    session.run("""
-                        MERGE (l:Language {name: $language})
-                        WITH l
-                        MATCH (t:Title {value: $title})
-                        MERGE (t)-[:WRITTEN_IN]->(l)
-                    """, language=language, title=title)
-                
-                # Create SchoolType node and relationship
-                if schooltype:
-                    session.run("""
-                        MERGE (st:SchoolType {type: $schooltype})
-                        WITH st
-                        MATCH (t:Title {value: $title})
-                        MERGE (t)-[:OF_SCHOOL_TYPE]->(st)
-                    """, schooltype=schooltype, title=title)
-                
-                # Create OadsClassifier node and relationship
-                if oadsclassifier:
-                    session.run("""
-                        MERGE (oc:OadsClassifier {value: $oadsclassifier})
-                        WITH oc
-                        MATCH (t:Title {value: $title})
-                        MERGE (t)-[:HAS_CLASSIFICATION]->(oc)
-                    """, oadsclassifier=oadsclassifier, title=title)
-                
-                # Create BornDigital node and relationship
-                if borndigital:
-                    session.run("""
-                        MERGE (bd:BornDigital {value: $borndigital})
-                        WITH bd
-                        MATCH (t:Title {value: $title})
-                        MERGE (t)-[:IS_BORN_DIGITAL]->(bd)
-                    """, borndigital=borndigital, title=title)
-        
-        end_time = time.time()  # End the timer
-        elapsed_time = end_time - start_time
-        print(f"Completed loading ETDs into Neo4j in {elapsed_time:.2f} seconds")
-        return True
-        
+
     except Exception as e:
         print(f"Error loading ETDs into Neo4j: {e}")
         import traceback
         traceback.print_exc()
         return False
 
+    finally:
+        # Only hashes of committed records were recorded, so this is safe
+        # to save even after a failure
+        if delta is not None:
+            delta.save()
+
 if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description="Load ETD metadata into Neo4j")
-    parser.add_argument("json_file", help="Path to the JSON file containing ETD metadata")
+    parser.add_argument("json_file", nargs="?", help="Path to the JSON file containing ETD metadata")
     parser.add_argument("--clear", action="store_true", help="Clear database before loading")
     parser.add_argument("--uri", default="bolt://localhost:7687", help="Neo4j connection URI")
     parser.add_argument("--username", default="neo4j", help="Neo4j username")
     parser.add_argument("--password", default="", help="Neo4j password")
     parser.add_argument("--debug", action="store_true", help="Enable additional debug output")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Number of ETDs written per transaction")
+    parser.add_argument("--workers", type=int, default=1, help="Parallel sessions for the two-phase load (1 = single session)")
+    parser.add_argument("--resume", action="store_true", help="Skip batches already committed according to the checkpoint file")
+    parser.add_argument("--checkpoint", help="Checkpoint file path (default: <json_file>.checkpoint.json)")
+    parser.add_argument("--delta", metavar="MANIFEST", help="Only write new or changed ETDs, tracking content hashes in this manifest file")
+    parser.add_argument("--delete-missing", action="store_true", help="With --delta, delete ETDs that are no longer in the source")
+    parser.add_argument("--cache-size", type=int, default=100000, help="Dimension node ids cached per label in this run (0 disables)")
+    parser.add_argument("--abstract-mode", choices=["node", "title"], default="node",
+                        help="Store abstracts on hash-keyed Abstract nodes or as a Title property")
+    parser.add_argument("--report", help="Load report path (default: <json_file>.report.json)")
+    parser.add_argument("--prometheus", metavar="PATH", help="Also write load metrics in Prometheus text format to PATH, updated during the load")
+    parser.add_argument("-v", "--verbose", action="count", default=0, help="Print every committed batch and skipped record")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print the summary, without per-batch errors")
+    parser.add_argument("--schema-only", action="store_true", help="Create constraints and indexes, then exit")
+    parser.add_argument("--skip-schema", action="store_true", help="Do not create constraints and indexes before loading")
     args = parser.parse_args()
+
+    if not args.json_file and not args.schema_only:
+        parser.error("json_file is required unless --schema-only is given")
+    if args.resume and args.clear:
+        parser.error("--resume cannot be combined with --clear")
+    if args.delta and args.resume:
+        parser.error("--delta cannot be combined with --resume")
+    if args.delete_missing and not args.delta:
+        parser.error("--delete-missing requires --delta")
     
     # Enable debug mode if requested
+    verbosity = 0 if args.quiet else 1 + args.verbose
     if args.debug:
+        verbosity = max(verbosity, 2)
         print("Debug mode enabled")
     
     # Update connection if needed
@@ -323,14 +770,27 @@ if __name__ == "__main__":
             print("Failed to clear database. Aborting.")
             sys.exit(1)
     
+    # Create constraints and indexes so MERGEs and lookups are index seeks
+    if args.schema_only or not args.skip_schema:
+        if not create_schema():
+            print("Failed to create schema. Aborting.")
+            sys.exit(1)
+        if args.schema_only:
+            sys.exit(0)
+
     # Load ETDs
-    if not load_etds_from_json(args.json_file):
+    if args.batch_size < 1:
+        print("Error: --batch-size must be at least 1")
+        sys.exit(1)
+
+    if args.workers < 1:
+        print("Error: --workers must be at least 1")
+        sys.exit(1)
+
+    if not load_etds_from_json(args.json_file, args.batch_size, args.workers, args.resume, args.checkpoint,
+                               args.delta, args.delete_missing, args.cache_size, args.abstract_mode,
+                               args.report, args.prometheus):
         print("Failed to load ETDs. Please check the errors above.")
         sys.exit(1)
-    
-    # Verify load
-    # if not verify_load():
-    #     print("Load verification failed. The data may not have been loaded correctly.")
-    #     sys.exit(1)
         
     print("ETD loading process completed successfully!")
\ No newline at end of file
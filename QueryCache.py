@@ -0,0 +1,84 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# String literals and IRIs are kept verbatim when normalizing
+_VERBATIM = re.compile(r'("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|<[^<>\s]*>)')
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_query(query):
+    """Collapse whitespace outside literals and IRIs, so reformatted copies of a query share a key"""
+    parts = _VERBATIM.split(query)
+    for i in range(0, len(parts), 2):
+        parts[i] = _WHITESPACE.sub(" ", parts[i])
+    return "".join(parts).strip()
+
+class QueryCache:
+    """
+    Results of read-only queries, keyed by normalized query text.
+
+    Holds at most max_entries results and evicts the least recently
+    used. An entry is fresh for ttl seconds; after that it is only kept
+    if the server gave an ETag, so it can be revalidated with
+    If-None-Match instead of fetched again.
+    """
+
+    def __init__(self, max_entries=256, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires, etag, result)
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return (result, etag, fresh) for a cached query, or None.
+
+        A stale entry is returned with fresh False for revalidation.
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, etag, result = entry
+            self.entries.move_to_end(key)
+            if time.monotonic() < expires:
+                self.hits += 1
+                return result, etag, True
+            self.misses += 1
+            if etag is None:
+                del self.entries[key]
+                return None
+            return result, etag, False
+
+    def put(self, key, result, etag=None):
+        with self._lock:
+            self.entries[key] = (time.monotonic() + self.ttl, etag, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def refresh(self, key):
+        """The server confirmed a stale entry is unchanged (304); return its result, fresh again"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            _, etag, result = entry
+            self.entries[key] = (time.monotonic() + self.ttl, etag, result)
+            self.revalidated += 1
+            return result
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        print(f"Query cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate), "
+              f"{self.revalidated} revalidated, {len(self.entries)} entries")
@@ -0,0 +1,158 @@
+import asyncio
+import time
+import VirtuosoSession
+
+class AdaptiveConcurrency:
+    """
+    Cap on requests in flight that adapts to the server (AIMD).
+
+    The cap grows by about one per round of fast successful requests, up
+    to max_limit, and halves when a request fails with a retryable error
+    or takes more than slow_factor times the fastest smoothed latency
+    seen. Cuts are at most once per smoothed latency, so one burst of
+    failures does not collapse it to 1.
+    """
+
+    def __init__(self, max_limit, slow_factor=3.0):
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.slow_factor = slow_factor
+        self.smoothed = None
+        self.baseline = None
+        self.cuts = 0
+        self._last_cut = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency, ok):
+        async with self._condition:
+            self.in_flight -= 1
+            if ok:
+                self.smoothed = latency if self.smoothed is None else 0.8 * self.smoothed + 0.2 * latency
+                self.baseline = self.smoothed if self.baseline is None else min(self.baseline, self.smoothed)
+            slow = ok and latency > self.slow_factor * self.baseline
+            now = time.monotonic()
+            if not ok or slow:
+                if now - self._last_cut > (self.smoothed or 0):
+                    self.limit = max(1.0, self.limit / 2)
+                    self.cuts += 1
+                    self._last_cut = now
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+async def _post(client, limiter, url, data, headers, retryable_status, metrics=None):
+    """One request, holding a concurrency slot only while it is in flight"""
+    await limiter.acquire()
+    start = time.perf_counter()
+    ok = False
+    status = None
+    try:
+        response = await client.post(url, content=data, headers=headers)
+        status = response.status_code
+        ok = response.status_code not in retryable_status
+        return response
+    except Exception as e:
+        status = type(e).__name__
+        raise
+    finally:
+        latency = time.perf_counter() - start
+        if metrics is not None and status is not None:
+            metrics.record_request(latency, status)
+        await limiter.release(latency, ok)
+
+class AsyncUploader:
+    """
+    Runs the request steps of each batch (see VirtuosoLoader.post_steps)
+    on an event loop with an async HTTP client, so up to concurrency
+    requests are sent at once from one thread, fewer while the server is
+    slow or returning errors. Used by VirtuosoLoader.load_etds_from_json
+    for --async; needs the optional httpx package.
+    """
+
+    name = "virtuoso-async"
+
+    def __init__(self, concurrency, username, password, retryable_status):
+        import httpx
+        self.httpx = httpx
+        self.concurrency = concurrency
+        self.auth = (username, password)
+        self.retryable_status = retryable_status
+        self.settings = {"concurrency": concurrency}
+        self.final_cap = concurrency
+        self.cuts = 0
+
+    def describe(self):
+        return f"up to {self.concurrency} requests in flight"
+
+    def run(self, jobs, on_done, metrics=None):
+        """
+        Run (batch_num, batch, steps) jobs, pulled from the iterator only
+        as slots free up, so at most 2 * concurrency batches are held in
+        memory. on_done(batch_num, batch, result) is called with the
+        (success, count) of the steps, or the exception they raised.
+        """
+        asyncio.run(self._run(jobs, on_done, metrics))
+
+    async def _run(self, jobs, on_done, metrics):
+        httpx = self.httpx
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        timeout = httpx.Timeout(VirtuosoSession.read_timeout, connect=VirtuosoSession.connect_timeout)
+        limiter = AdaptiveConcurrency(self.concurrency)
+        batch_slots = asyncio.Semaphore(self.concurrency * 2)
+
+        async with httpx.AsyncClient(auth=httpx.DigestAuth(*self.auth), limits=limits, timeout=timeout) as client:
+
+            async def run_one(batch_num, batch, steps):
+                try:
+                    try:
+                        result = await self._run_steps(client, limiter, steps, metrics)
+                    except Exception as e:
+                        result = e
+                    on_done(batch_num, batch, result)
+                finally:
+                    batch_slots.release()
+
+            tasks = set()
+            for batch_num, batch, steps in jobs:
+                await batch_slots.acquire()
+                task = asyncio.create_task(run_one(batch_num, batch, steps))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*list(tasks))
+
+        self.final_cap = int(limiter.limit)
+        self.cuts += limiter.cuts
+
+    async def _run_steps(self, client, limiter, steps, metrics):
+        """Async counterpart of VirtuosoLoader.run_steps"""
+        httpx = self.httpx
+        try:
+            step = next(steps)
+            while True:
+                if step[0] == "sleep":
+                    await asyncio.sleep(step[1])
+                    step = steps.send(None)
+                    continue
+                _, url, data, headers = step
+                try:
+                    response = await _post(client, limiter, url, data, headers, self.retryable_status, metrics)
+                except httpx.TransportError as e:
+                    error = VirtuosoSession.RequestError(e, timeout=isinstance(e, httpx.ReadTimeout))
+                    step = steps.throw(error)
+                except Exception as e:
+                    step = steps.throw(e)
+                else:
+                    step = steps.send(response)
+        except StopIteration as stop:
+            return stop.value
+
+    def summary(self):
+        """Print how the uploader behaved; returns extra load report fields"""
+        print(f"Concurrency cap ended at {self.final_cap} of {self.concurrency} ({self.cuts} slowdowns)")
+        return {"concurrency": {"final_cap": self.final_cap, "slowdowns": self.cuts}}
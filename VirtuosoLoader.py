@@ -1,18 +1,61 @@
+import gzip
+import itertools
 import json
 import os
+import random
+import threading
 import time
 import requests
-from requests.auth import HTTPDigestAuth
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import VirtuosoSession
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from multiprocessing import Pool
 from ETDQueries import clear_graph
 from tqdm import tqdm
+from LoadCheckpoint import LoadCheckpoint, default_checkpoint_path, source_params
+from DeltaManifest import DeltaManifest, record_hash
+from ETDStream import iter_batches, iter_etds
+from LoadMetrics import LoadMetrics
+from urllib.parse import quote
+from ETDSerializer import NT_PREDICATES, etd_iri, etd_triples, insert_data_query, to_ntriples, to_turtle
 
 # Configuration
 endpoint_URL = "https://virtuoso.endeavour.cs.vt.edu/sparql-auth"
+gsp_URL = "https://virtuoso.endeavour.cs.vt.edu/sparql-graph-crud-auth"  # SPARQL 1.1 Graph Store Protocol
 graph_URI = "http://erdkb.endeavour.cs.vt.edu/ETDs"
 username = "dba"
 password = "admin"
-batch_size = 100  # Reduced from 1000 to avoid 413 errors
+batch_size = 100  # ETD ids per DELETE batch
+max_request_bytes = 1024 * 1024  # INSERT DATA batches are built up to this body size
+gsp_max_request_bytes = 16 * 1024 * 1024  # Uncompressed triples per Graph Store upload
+max_retries = 4  # Extra attempts for a request that fails with a transient error
+retry_base_delay = 1.0  # seconds, doubled on every attempt
+retry_max_delay = 30.0  # seconds
+verbosity = 1  # 0: summary only, 1: progress bars and errors, 2: also every batch and retry
+verify_sample_size = 5  # ETDs per batch read back with --verify
+
+# Overload and gateway errors worth retrying; anything else is permanent
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+SPARQL_UPDATE_HEADERS = {
+    "Content-Type": "application/sparql-update; charset=utf-8",
+    "Accept": "application/sparql-results+json"
+}
+
+SPARQL_QUERY_HEADERS = {
+    "Content-Type": "application/sparql-query; charset=utf-8",
+    "Accept": "application/sparql-results+json"
+}
+
+# Graph Store Protocol upload formats: content type and serializer
+GSP_FORMATS = {
+    "ntriples": ("application/n-triples", to_ntriples),
+    "turtle": ("text/turtle", to_turtle),
+}
+
+def log(message, level=2):
+    """Print a message if verbosity is at least level, without breaking the progress bar"""
+    if verbosity >= level:
+        tqdm.write(message)
 
 def send_sparql_query(query):
     """Send a SPARQL query to the Virtuoso endpoint"""
@@ -32,30 +75,101 @@ def send_sparql_query(query):
     
     #print(f"DEBUG - Sending query (first 500 chars):\n{debug_query[:500]}...\n")
     
-    headers = {
-        "Content-Type": "application/sparql-update; charset=utf-8",
-        "Accept": "application/sparql-results+json"
-    }
-
     try:
-        response = requests.post(
-            endpoint_URL,
-            data=query.encode('utf-8'),
-            auth=HTTPDigestAuth(username, password),
-            headers=headers
-        )
+        # Pooled keep-alive connection with the digest nonce already negotiated
+        response = VirtuosoSession.post(endpoint_URL, query.encode('utf-8'), SPARQL_UPDATE_HEADERS, username, password)
         
         #print(f"DEBUG - Response status: {response.status_code}")
         #print(f"DEBUG - Response headers: {response.headers}")
         
         if response.status_code != 200:
-            print(f"DEBUG - Response text: {response.text}")
+            log(f"DEBUG - Response text: {response.text}")
         
         return response
     except Exception as e:
-        print(f"DEBUG - Exception in send_sparql_query: {str(e)}")
+        log(f"DEBUG - Exception in send_sparql_query: {str(e)}")
         raise
 
+def graph_store_request(content_type):
+    """URL and headers for POSTing gzipped triples into graph_URI"""
+    headers = {
+        "Content-Type": f"{content_type}; charset=utf-8",
+        "Content-Encoding": "gzip",
+    }
+    return f"{gsp_URL}?graph-uri={quote(graph_URI, safe='')}", headers
+
+def backoff_delay(attempt, retry_after=None):
+    """Exponential backoff with full jitter, at least the server's Retry-After"""
+    delay = random.uniform(0, min(retry_max_delay, retry_base_delay * 2 ** attempt))
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, min(retry_max_delay, float(retry_after)))
+    return delay
+
+def post_steps(url, data, headers, batch_num=None, retry_timeouts=True, metrics=None):
+    """
+    Steps of one POST, retrying connection errors, timeouts and
+    retryable status codes with exponential backoff
+    
+    A generator shared by the threaded and async loaders: it yields
+    ("post", url, data, headers) for every attempt and is sent back the
+    response, or thrown the exception the attempt failed with, and
+    yields ("sleep", seconds) before each retry. run_steps runs it with
+    blocking requests, VirtuosoAsync.AsyncUploader on an event loop.
+    
+    Returns the last response, or raises the last RequestError if every
+    attempt failed with one. With retry_timeouts False a read timeout
+    is raised straight away so the caller can split the batch instead.
+    """
+    for attempt in range(max_retries + 1):
+        retry_after = None
+        try:
+            response = yield ("post", url, data, headers)
+        except VirtuosoSession.RequestError as e:
+            if attempt == max_retries or (not retry_timeouts and e.timeout):
+                raise
+            reason = e.reason
+        else:
+            if response.status_code not in RETRYABLE_STATUS or attempt == max_retries:
+                return response
+            reason = response.status_code
+            retry_after = response.headers.get("Retry-After")
+        delay = backoff_delay(attempt, retry_after)
+        if metrics is not None:
+            metrics.count("retries")
+        log(f"Batch {batch_num} failed ({reason}), retry {attempt+1}/{max_retries} in {delay:.1f} seconds")
+        yield ("sleep", delay)
+
+def run_steps(steps, metrics=None):
+    """
+    Run request steps (see post_steps) with blocking requests through
+    the pooled session and return their result. Every request is
+    recorded in metrics, if given.
+    """
+    try:
+        step = next(steps)
+        while True:
+            if step[0] == "sleep":
+                time.sleep(step[1])
+                step = steps.send(None)
+                continue
+            _, url, data, headers = step
+            start = time.perf_counter()
+            try:
+                response = VirtuosoSession.post(url, data, headers, username, password)
+            except Exception as e:
+                if metrics is not None:
+                    metrics.record_request(time.perf_counter() - start, type(e).__name__)
+                if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                    step = steps.throw(VirtuosoSession.RequestError(e, timeout=isinstance(e, requests.ReadTimeout)))
+                else:
+                    step = steps.throw(e)
+            else:
+                if metrics is not None:
+                    metrics.record_request(time.perf_counter() - start, response.status_code)
+                step = steps.send(response)
+    except StopIteration as stop:
+        return stop.value
+
 def create_insert_query(etds):
     """
     Create a SPARQL INSERT query for a batch of ETDs
@@ -66,233 +180,720 @@ def create_insert_query(etds):
     Returns:
         SPARQL INSERT query string
     """
-    # Use format consistent with DBaccess.py
-    query = f"INSERT DATA {{ GRAPH <{graph_URI}> {{"
+    return insert_data_query(etds, graph_URI)
+
+def create_delete_query(etd_ids):
+    """
+    Create a SPARQL DELETE removing every triple about the given ETDs
+    
+    Args:
+        etd_ids: List of ETD ids
+        
+    Returns:
+        SPARQL DELETE query string
+    """
+    values = " ".join(f"<http://etdkb.endeavour.cs.vt.edu/v1/objects/{etd_id}>" for etd_id in etd_ids)
+    return (f"DELETE {{ GRAPH <{graph_URI}> {{ ?s ?p ?o }} }}\n"
+            f"WHERE {{ GRAPH <{graph_URI}> {{ VALUES ?s {{ {values} }} ?s ?p ?o }} }}")
+
+def verify_sample(batch, sample_size=None):
+    """IRIs of a random sample of the batch's ETDs, without duplicates"""
+    sample = random.sample(batch, min(sample_size or verify_sample_size, len(batch)))
+    return sorted({etd_iri(etd['id']) for etd in sample})
+
+def create_verify_query(iris):
+    """SELECT returning which of the ETD IRIs have a title in graph_URI"""
+    values = " ".join(iris)
+    return (f"SELECT DISTINCT ?s WHERE {{ GRAPH <{graph_URI}> {{ "
+            f"VALUES ?s {{ {values} }} ?s {NT_PREDICATES['hasTitle']} ?title }} }}")
+
+def check_verified(iris, found, batch_num, errors=None, metrics=None):
+    """
+    Record the read-back of a batch; found is the number of sampled IRIs
+    the endpoint returned, or None if the query failed
+
+    Returns True if every sampled ETD was found.
+    """
+    if metrics is not None:
+        metrics.count("verify_checked", len(iris))
+        metrics.count("verify_found", found or 0)
+    if found == len(iris):
+        log(f"Batch {batch_num} verified ({found} ETDs read back)")
+        return True
+    if found is None:
+        message = "verification query failed"
+    else:
+        message = f"failed verification, {found} of {len(iris)} sampled ETDs found in {graph_URI}"
+    log(f"Batch {batch_num} {message}", 1)
+    _record_error(errors, False, message)
+    if metrics is not None:
+        metrics.count("batches_unverified")
+    return False
+
+def verify_steps(batch, batch_num=None, errors=None, metrics=None, sample_size=None):
+    """
+    Steps reading back a sample of a loaded batch with one VALUES query,
+    since the endpoint can answer 200 OK to INSERT DATA without
+    persisting it (see post_steps)
     
+    Returns True if every sampled ETD was found.
+    """
+    iris = verify_sample(batch, sample_size)
+    found = None
+    try:
+        query = create_verify_query(iris).encode('utf-8')
+        response = yield from post_steps(endpoint_URL, query, SPARQL_QUERY_HEADERS, batch_num, metrics=metrics)
+        if response.status_code == 200:
+            found = len(response.json()["results"]["bindings"])
+        else:
+            log(f"Error verifying batch {batch_num}: {response.status_code} - {response.text[:500]}", 1)
+    except Exception as e:
+        log(f"Exception verifying batch {batch_num}: {str(e)}", 1)
+    return check_verified(iris, found, batch_num, errors, metrics)
+
+def verify_loaded(batch, batch_num=None, errors=None, metrics=None, sample_size=None):
+    """Read back a sample of a loaded batch; returns True if every sampled ETD was found"""
+    return run_steps(verify_steps(batch, batch_num, errors, metrics, sample_size), metrics)
+
+def verification_summary(metrics, loaded):
+    """Print and return how much of the load was read back"""
+    checked = metrics.counters.get("verify_checked", 0)
+    found = metrics.counters.get("verify_found", 0)
+    summary = {"checked": checked, "found": found, "loaded": loaded,
+               "fraction_checked": round(checked / loaded, 4) if loaded else None,
+               "batches_unverified": metrics.counters.get("batches_unverified", 0)}
+    print(f"Verification: {found} of {checked} sampled ETDs found "
+          f"({summary['fraction_checked'] or 0:.2%} of {loaded} loaded ETDs read back)")
+    return summary
+
+def record_size(etd):
+    """UTF-8 size of the triples one ETD adds to an INSERT DATA query"""
+    return sum(len(triple.encode('utf-8')) + 1 for triple in etd_triples(etd))
+
+def iter_byte_batches(etds, max_bytes, max_records=None):
+    """
+    Group ETDs into batches whose INSERT DATA body stays within max_bytes,
+    and at most max_records ETDs each when given
+    
+    A single ETD larger than max_bytes gets a batch of its own.
+    """
+    overhead = len(create_insert_query([]).encode('utf-8'))
+    batch = []
+    size = overhead
     for etd in etds:
-        # URI for the ETD - use format that follows the web server route structure
-        etd_uri = f"http://etdkb.endeavour.cs.vt.edu/v1/objects/{etd['id']}"
-        
-        # Helper function to properly escape text for SPARQL
-        def escape_for_sparql(text):
-            if not text:
-                return ""
-            # Handle common escape sequences
-            text = text.replace('\\', '\\\\') 
-            text = text.replace('"', '\\"')
-            text = text.replace('\n', '\\n')
-            text = text.replace('\r', '\\r')
-            text = text.replace('\t', '\\t')
-
-            # Remove other non-printable characters that could cause issues
-            text = ''.join(c for c in text if c.isprintable() or c in ['\n', '\r', '\t'])
-            return text
-        
-        # Set up predicates with the proper URL format
-        title_predicate = f"http://etdkb.endeavour.cs.vt.edu/v1/predicate/hasTitle"
-        author_predicate = f"http://etdkb.endeavour.cs.vt.edu/v1/predicate/Author"
-        year_predicate = f"http://etdkb.endeavour.cs.vt.edu/v1/predicate/issuedDate"
-        uri_predicate = f"http://etdkb.endeavour.cs.vt.edu/v1/predicate/identifier"
-        abstract_predicate = f"http://etdkb.endeavour.cs.vt.edu/v1/predicate/hasAbstract"
-        department_predicate = f"http://etdkb.endeavour.cs.vt.edu/v1/predicate/academicDepartment"
-        discipline_predicate = f"http://etdkb.endeavour.cs.vt.edu/v1/predicate/academicDiscipline"
-        university_predicate = f"http://etdkb.endeavour.cs.vt.edu/v1/predicate/publishedBy"
-        keyword_predicate = f"http://etdkb.endeavour.cs.vt.edu/v1/predicate/hasKeyword"
-        hasAuthor_predicate = f"http://etdkb.endeavour.cs.vt.edu/v1/predicate/hasAuthor"
-        hasChapter_predicate = f"http://etdkb.endeavour.cs.vt.edu/v1/predicate/hasPart"
-        academicAdvisor_predicate = f"http://etdkb.endeavour.cs.vt.edu/v1/predicate/academicAdvisor"
-        
-        # Safely escape and format the title
-        title = escape_for_sparql(etd['title'])
-        query += f"\n<{etd_uri}> <{title_predicate}> \"{title}\" ."
-        
-        author = escape_for_sparql(etd['author'])
-        query += f"\n<{etd_uri}> <{author_predicate}> \"{author}\" ."
-        # Add author as object reference too
-        author_obj = f"http://etdkb.endeavour.cs.vt.edu/v1/objects/author{etd['id']}"
-        query += f"\n<{etd_uri}> <{hasAuthor_predicate}> <{author_obj}> ."
-        
-        if 'year' in etd and etd['year']:
-            query += f"\n<{etd_uri}> <{year_predicate}> \"{int(etd['year'])}\" ."
-        
-        # Add URI if available
-        if 'URI' in etd and etd['URI']:
-            uri = escape_for_sparql(etd['URI'])
-            query += f"\n<{etd_uri}> <{uri_predicate}> \"{uri}\" ."
-        
-        # Additional metadata if available
-        if 'abstract' in etd and etd['abstract']:
-            abstract = escape_for_sparql(etd['abstract'])
-            query += f"\n<{etd_uri}> <{abstract_predicate}> \"{abstract}\" ."
-        
-        if 'department' in etd and etd['department']:
-            department = escape_for_sparql(etd['department']).replace(' ','-')
-            department_obj = f"http://etdkb.endeavour.cs.vt.edu/v1/objects/{department}"
-            query += f"\n<{etd_uri}> <{department_predicate}> <{department_obj}> ."
-
-        if 'advisor' in etd and etd['advisor']:
-            advisor = escape_for_sparql(etd['advisor'])
-            query += f"\n<{etd_uri}> <{academicAdvisor_predicate}> \"{advisor}\" ."
-        
-        if 'discipline' in etd and etd['discipline']:
-            discipline = escape_for_sparql(etd['discipline']).replace(' ','-')
-            discipline_obj = f"http://etdkb.endeavour.cs.vt.edu/v1/objects/{discipline}"
-            query += f"\n<{etd_uri}> <{discipline_predicate}> <{discipline_obj}> ."
-        
-        if 'university' in etd and etd['university']:
-            university = etd['university'].replace(' ','-').replace('\r','').replace('\n','')
-            university_obj = f"http://etdkb.endeavour.cs.vt.edu/v1/objects/{university}"
-            query += f"\n<{etd_uri}> <{university_predicate}> <{university_obj}> ."
-        
-        # Keywords as separate triples
-        if 'keywords' in etd and etd['keywords']:
-            for i, keyword in enumerate(etd['keywords']):
-                if keyword:
-                    keyword = escape_for_sparql(keyword)
-                    query += f"\n<{etd_uri}> <{keyword_predicate}> \"{keyword}\" ."
-                    # Add keyword as object reference too
-                    keyword_obj = f"http://etdkb.endeavour.cs.vt.edu/v1/objects/{keyword.replace(' ', '-')}"
-                    query += f"\n<{etd_uri}> <{hasChapter_predicate}> <{keyword_obj}> ."
-    
-    # Close the query - exactly two closing braces, no more
-    query += "\n}}"
-    
-    return query
-
-def load_batch(batch, batch_num=None):
+        etd_size = record_size(etd)
+        if batch and (size + etd_size > max_bytes or (max_records and len(batch) >= max_records)):
+            yield batch
+            batch = []
+            size = overhead
+        batch.append(etd)
+        size += etd_size
+    if batch:
+        yield batch
+
+class RequestSizeLimit:
+    """
+    Largest request body the endpoint has accepted, and the smallest it
+    has rejected with a 413 or a timeout, shared by all workers
+    
+    Batches at or above a rejected size are split before sending, so a
+    limit found by one worker is not rediscovered by the others, and into
+    pieces sized between the two, so later batches are not bisected again
+    from the full size.
+    """
+    
+    def __init__(self):
+        self.largest_ok = 0
+        self.smallest_rejected = None
+        self.splits = 0
+        self._lock = threading.Lock()
+    
+    def fits(self, size):
+        return self.smallest_rejected is None or size < self.smallest_rejected
+    
+    def accepted(self, size):
+        with self._lock:
+            self.largest_ok = max(self.largest_ok, size)
+    
+    def rejected(self, size):
+        with self._lock:
+            self.splits += 1
+            if self.smallest_rejected is None or size < self.smallest_rejected:
+                self.smallest_rejected = size
+    
+    def parts(self, size):
+        """Number of pieces to split a request of size bytes into so each should be accepted"""
+        with self._lock:
+            rejected = self.smallest_rejected or size
+            accepted = self.largest_ok if self.largest_ok < rejected else 0
+        # Aim halfway between the largest accepted and smallest rejected
+        # size; with nothing accepted yet this halves the request
+        target = max(1, (accepted + rejected) // 2)
+        return max(2, -(-size // target))
+    
+    def report(self):
+        print(f"Largest accepted request: {self.largest_ok/1024:.2f} KB", end="")
+        if self.smallest_rejected is not None:
+            print(f", smallest rejected: {self.smallest_rejected/1024:.2f} KB ({self.splits} batches split)")
+        else:
+            print()
+
+def _record_error(errors, retryable, message):
+    if errors is not None:
+        errors.append((retryable, message))
+
+def build_request(batch, replace_ids=None, upload=None):
+    """Return (url, body, headers) for loading one batch"""
+    if upload:
+        content_type, serialize = GSP_FORMATS[upload]
+        url, headers = graph_store_request(content_type)
+        return url, gzip.compress(serialize(batch).encode('utf-8'), compresslevel=1), headers
+    query = create_insert_query(batch)
+    if replace_ids:
+        query = create_delete_query(replace_ids) + " ;\n" + query
+    return endpoint_URL, query.encode('utf-8'), SPARQL_UPDATE_HEADERS
+
+def load_batch(batch, batch_num=None, replace_ids=None, size_limit=None, errors=None, upload=None, metrics=None):
     """
     Load a batch of ETDs into the database
     
     Args:
         batch: List of ETD dictionaries
         batch_num: Batch number (for logging)
+        replace_ids: Ids of changed ETDs whose old triples are deleted
+            in the same request before the insert
+        size_limit: RequestSizeLimit; batches that are too large for the
+            endpoint (413 or timeout) are split into pieces below the
+            smallest rejected size and retried
+        errors: List that failures are appended to as (retryable, message),
+            retryable meaning the error was transient and the batch may
+            succeed if requeued
+        upload: "ntriples" or "turtle" to POST the batch to the Graph
+            Store Protocol endpoint instead of sending INSERT DATA
+        metrics: LoadMetrics that serialization time, request size and
+            every request attempt are recorded in
         
     Returns:
         Tuple of (success, count) where:
             success: True if the batch was loaded successfully
             count: Number of ETDs in the batch
     """
+    return run_steps(batch_steps(batch, batch_num, replace_ids, size_limit, errors, upload, metrics), metrics)
+
+def batch_steps(batch, batch_num=None, replace_ids=None, size_limit=None, errors=None, upload=None, metrics=None):
+    """Steps of load_batch (see post_steps), shared by the threaded and async loaders"""
     try:
         count = len(batch)
         if batch_num is not None:
-            print(f"Processing batch {batch_num} with {count} ETDs...")
-        
-        query = create_insert_query(batch)
-        query_size = len(query.encode('utf-8'))
-        print(f"Batch {batch_num} query size: {query_size/1024:.2f} KB")
-        
-        response = send_sparql_query(query)
-        
-        if response.status_code == 200:
-            print(f"Batch {batch_num} loaded successfully")
+            log(f"Processing batch {batch_num} with {count} ETDs...")
+        
+        if upload and replace_ids:
+            # The Graph Store Protocol can only add triples, so remove
+            # the old versions of changed ETDs first
+            query = create_delete_query(replace_ids).encode('utf-8')
+            response = yield from post_steps(endpoint_URL, query, SPARQL_UPDATE_HEADERS, batch_num, metrics=metrics)
+            if response.status_code != 200:
+                log(f"Error deleting changed ETDs in batch {batch_num}: {response.status_code} - {response.text[:500]}", 1)
+                _record_error(errors, response.status_code in RETRYABLE_STATUS,
+                              f"{response.status_code} - {response.text[:200]}")
+                return False, 0
+            replace_ids = None
+        
+        serialize_start = time.perf_counter()
+        url, data, headers = build_request(batch, replace_ids, upload)
+        size = len(data)
+        if metrics is not None:
+            metrics.observe("serialize_seconds", time.perf_counter() - serialize_start)
+            metrics.observe("request_bytes", size)
+        log(f"Batch {batch_num} request size: {size/1024:.2f} KB")
+        
+        splittable = size_limit is not None and count > 1
+        if splittable and not size_limit.fits(size):
+            return (yield from _split_steps(batch, batch_num, replace_ids, size_limit, size, errors, upload, metrics))
+        
+        try:
+            response = yield from post_steps(url, data, headers, batch_num, retry_timeouts=not splittable,
+                                             metrics=metrics)
+        except VirtuosoSession.RequestError as e:
+            if not (splittable and e.timeout):
+                raise
+            log(f"Batch {batch_num} timed out at {size/1024:.2f} KB, splitting")
+            size_limit.rejected(size)
+            return (yield from _split_steps(batch, batch_num, replace_ids, size_limit, size, errors, upload, metrics))
+        
+        if response.status_code == 200 or (upload and 200 <= response.status_code < 300):
+            if size_limit is not None:
+                size_limit.accepted(size)
+            log(f"Batch {batch_num} loaded successfully")
             return True, count
+        elif response.status_code == 413 and splittable:
+            log(f"Batch {batch_num} too large at {size/1024:.2f} KB, splitting")
+            size_limit.rejected(size)
+            return (yield from _split_steps(batch, batch_num, replace_ids, size_limit, size, errors, upload, metrics))
         else:
-            print(f"Error loading batch {batch_num}: {response.status_code} - {response.text[:500]}")
+            log(f"Error loading batch {batch_num}: {response.status_code} - {response.text[:500]}", 1)
+            _record_error(errors, response.status_code in RETRYABLE_STATUS,
+                          f"{response.status_code} - {response.text[:200]}")
             return False, 0
     except Exception as e:
-        print(f"Exception in batch {batch_num}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log(f"Exception in batch {batch_num}: {str(e)}", 1)
+        if verbosity >= 2:
+            import traceback
+            traceback.print_exc()
+        _record_error(errors, isinstance(e, VirtuosoSession.RequestError), str(e))
         return False, 0
 
-def load_etds_from_json(json_file_path, max_batches=None, num_workers=4,clean=False):
+def split_batch(batch, parts):
+    """Cut a batch into parts pieces of (nearly) equal length"""
+    parts = min(parts, len(batch))
+    bounds = [len(batch) * i // parts for i in range(parts + 1)]
+    return [batch[bounds[i]:bounds[i+1]] for i in range(parts)]
+
+def _split_steps(batch, batch_num, replace_ids, size_limit, size, errors=None, upload=None, metrics=None):
+    """Load a batch that was too large in smaller pieces; the batch succeeds if all of them do"""
+    loaded = 0
+    success = True
+    for piece in split_batch(batch, size_limit.parts(size)):
+        piece_ids = None
+        if replace_ids:
+            ids = {str(etd['id']) for etd in piece}
+            piece_ids = [etd_id for etd_id in replace_ids if etd_id in ids]
+        ok, count = yield from batch_steps(piece, batch_num, piece_ids, size_limit, errors, upload, metrics)
+        success = success and ok
+        loaded += count
+    # INSERT DATA is idempotent, so rerunning a partly loaded batch is safe
+    return success, loaded if success else 0
+
+def default_dead_letter_path(data_path):
+    return f"{data_path}.deadletter.jsonl"
+
+def write_dead_letters(path, failed, batch_errors):
+    """
+    Write the ETDs of batches that still failed at the end of a run as
+    JSONL, one {"batch", "error", "etd"} object per line, for --replay
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for batch_num, batch in failed:
+            errors = batch_errors.get(batch_num)
+            message = errors[-1][1] if errors else "unknown error"
+            for etd in batch:
+                f.write(json.dumps({"batch": batch_num, "error": message, "etd": etd}, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
+def read_dead_letters(path):
+    """Return the ETDs recorded in a dead-letter file"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["etd"] for line in f if line.strip()]
+
+def delete_missing_etds(delta):
+    """Delete ETDs that are in the manifest but no longer in the source"""
+    missing = delta.missing()
+    deleted = 0
+    for i in range(0, len(missing), batch_size):
+        chunk = missing[i:i+batch_size]
+        response = send_sparql_query(create_delete_query(chunk))
+        if response.status_code != 200:
+            print(f"Error deleting missing ETDs: {response.status_code} - {response.text[:500]}")
+            break
+        delta.remove(chunk)
+        deleted += len(chunk)
+    print(f"Deleted {deleted} of {len(missing)} ETDs no longer in the source")
+
+def _write_shard(path, etds):
+    """Write one gzipped N-Triples shard and return its triple count"""
+    triples = []
+    for etd in etds:
+        triples.extend(etd_triples(etd))
+    triples.append("")
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+        f.write("\n".join(triples))
+    os.replace(tmp_path, path)
+    return len(triples) - 1
+
+def export_ntriples(json_file_path, out_dir, shard_size=10000, processes=None):
+    """
+    Export ETDs as gzipped N-Triples shards for Virtuoso's bulk loader
+    
+    Writes the same triples create_insert_query produces to
+    out_dir/etds-NNNNN.nt.gz, shard_size ETDs per file, compressed in
+    parallel processes. At most one shard per process is pending at a
+    time, so memory is bounded by processes * shard_size ETDs. A
+    global.graph file names graph_URI for every file in the directory
+    and manifest.json lists the triple count of each shard.
+    
+    Returns:
+        True if the export was successful, False otherwise
+    """
+    try:
+        start_time = time.time()
+        os.makedirs(out_dir, exist_ok=True)
+        processes = processes or os.cpu_count() or 1
+        
+        shards = []
+        pending = []
+        with Pool(processes) as pool:
+            # Wait for the oldest shard once every process has one, so the
+            # reader never holds more than processes shards in memory
+            for shard_num, etds in enumerate(iter_batches(iter_etds(json_file_path), shard_size)):
+                name = f"etds-{shard_num:05d}.nt.gz"
+                pending.append((name, len(etds), pool.apply_async(_write_shard, (os.path.join(out_dir, name), etds))))
+                while len(pending) >= processes:
+                    name, count, result = pending.pop(0)
+                    shards.append({"file": name, "etds": count, "triples": result.get()})
+            for name, count, result in pending:
+                shards.append({"file": name, "etds": count, "triples": result.get()})
+        
+        with open(os.path.join(out_dir, "global.graph"), "w", encoding="utf-8") as f:
+            f.write(graph_URI + "\n")
+        manifest = {
+            "source": os.path.abspath(json_file_path),
+            "graph": graph_URI,
+            "etds": sum(shard["etds"] for shard in shards),
+            "triples": sum(shard["triples"] for shard in shards),
+            "shards": shards,
+        }
+        with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        
+        elapsed_time = time.time() - start_time
+        print(f"Exported {manifest['etds']} ETDs ({manifest['triples']} triples) to {len(shards)} shards "
+              f"in {out_dir} in {elapsed_time:.2f} seconds")
+        print("Load them on the Virtuoso server with isql:")
+        print(f"  ld_dir('{os.path.abspath(out_dir)}', '*.nt.gz', '{graph_URI}');")
+        print("  rdf_loader_run();")
+        print("  checkpoint;")
+        return True
+    
+    except Exception as e:
+        print(f"Error exporting ETDs: {str(e)}")
+        return False
+
+def write_load_report(metrics, json_file_path, report_path=None, prometheus_path=None, **extra):
+    """Write the JSON load report and the Prometheus file, and print the headline numbers"""
+    if report_path is None:
+        report_path = f"{json_file_path}.report.json"
+    report = metrics.write_json(report_path, **extra)
+    counters = report["counters"]
+    latency = report["batch_latency_seconds"]
+    print(f"Requests: {counters.get('requests', 0)} ({counters.get('retries', 0)} retries), "
+          f"batch latency p50={latency['p50']} p99={latency['p99']} seconds")
+    print(f"Load report written to {report_path}")
+    if prometheus_path:
+        metrics.write_prometheus(prometheus_path)
+        print(f"Prometheus metrics written to {prometheus_path}")
+    return report
+
+class ThreadedUploader:
+    """Runs the request steps of each batch with blocking requests in a pool of worker threads"""
+    
+    name = "virtuoso"
+    
+    def __init__(self, workers):
+        self.workers = workers
+        self.settings = {"workers": workers}
+        # One pooled connection per worker
+        VirtuosoSession.configure(workers=workers)
+    
+    def describe(self):
+        return f"{self.workers} parallel workers"
+    
+    def run(self, jobs, on_done, metrics=None):
+        """
+        Run (batch_num, batch, steps) jobs, pulled from the iterator only
+        as workers free up, so at most 2 * workers batches are held in
+        memory. on_done(batch_num, batch, result) is called in this thread
+        with the (success, count) of the steps, or the exception they raised.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {}
+            for batch_num, batch, steps in jobs:
+                futures[executor.submit(run_steps, steps, metrics)] = (batch_num, batch)
+                if len(futures) >= self.workers * 2:
+                    self._collect(futures, on_done, FIRST_COMPLETED)
+            self._collect(futures, on_done, ALL_COMPLETED)
+    
+    def _collect(self, futures, on_done, return_when):
+        done, _ = wait(futures, return_when=return_when)
+        for future in done:
+            batch_num, batch = futures.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                result = e
+            on_done(batch_num, batch, result)
+    
+    def summary(self):
+        """Print how the uploader behaved; returns extra load report fields"""
+        return {}
+
+def _delta_key(etd):
+    return str(etd.get('id', '')), record_hash(etd)
+
+def load_etds_from_json(json_file_path, max_batches=None, num_workers=4,clean=False, resume=False, checkpoint_path=None,
+                        delta_path=None, delete_missing=False, max_bytes=None, max_records=None, replay=False,
+                        dead_letter_path=None, upload=None, report_path=None, prometheus_path=None, verify=None,
+                        force=False, concurrency=None):
     """
     Load ETDs from a JSON file into the database
     
+    Batches are built lazily while earlier ones are in flight. They are
+    sent by num_workers threads, or with concurrency set by
+    VirtuosoAsync.AsyncUploader; both run the same request steps, so
+    retries, splitting, verification and checkpoints behave the same.
+    
     Args:
         json_file_path: Path to the JSON file
         max_batches: Maximum number of batches to load (None for all)
         num_workers: Number of parallel workers for batch loading
+        clean: Drop and recreate the graph before loading
+        resume: Skip batches already committed according to the checkpoint
+        checkpoint_path: Checkpoint file (default: <json_file_path>.checkpoint.json)
+        delta_path: Manifest of ETD content hashes; only new or changed ETDs are written
+        delete_missing: With delta_path, delete ETDs no longer in the source
+        max_bytes: Request body budget per batch, uncompressed (default:
+            max_request_bytes, or gsp_max_request_bytes with upload)
+        max_records: Optional cap on ETDs per batch
+        replay: json_file_path is a dead-letter file from an earlier run;
+            it is only read, so a checkpoint of the replay stays valid
+        dead_letter_path: Where ETDs of batches that still fail are written
+            (default: <json_file_path>.deadletter.jsonl); a file left there
+            by an earlier run is removed when every batch loads
+        upload: "ntriples" or "turtle" to POST gzipped batches to the
+            Graph Store Protocol endpoint instead of sending INSERT DATA
+        report_path: JSON load report (default: <json_file_path>.report.json)
+        prometheus_path: Optional Prometheus text file, rewritten every
+            few seconds during the load
+        verify: "batch" to read back a sample of each batch right after
+            it loads, or "end" to read back every batch after the load;
+            batches that fail are treated as failed batches
+        force: With verify, keep going after a batch fails verification
+            instead of stopping the load
+        concurrency: Load with asyncio and up to this many requests in
+            flight instead of worker threads (needs httpx)
         
     Returns:
         True if loading was successful, False otherwise
     """
+    if concurrency:
+        try:
+            from VirtuosoAsync import AsyncUploader
+            uploader = AsyncUploader(concurrency, username, password, RETRYABLE_STATUS)
+        except ImportError:
+            print("Error: --async requires the httpx package (pip install httpx)")
+            return False
+    else:
+        uploader = ThreadedUploader(num_workers)
+    
+    delta = None
     try:
         start_time = time.time()
+        metrics = LoadMetrics(uploader.name, os.path.abspath(json_file_path))
+
+        # A delta load only writes records whose hash differs from the manifest
+        if delta_path:
+            if resume:
+                print("Error: --resume cannot be combined with --delta; rerun the delta load instead")
+                return False
+            delta = DeltaManifest.open(delta_path)
+
+        # Never write failures over the input, a checkpoint of it would
+        # then skip batches that hold different ETDs
+        if dead_letter_path is None:
+            dead_letter_path = default_dead_letter_path(json_file_path)
+        if os.path.abspath(dead_letter_path) == os.path.abspath(json_file_path):
+            print("Error: the dead-letter file cannot be the input file")
+            return False
+
+        # Committed and failed batches are recorded so a failed run can resume
+        if checkpoint_path is None:
+            checkpoint_path = default_checkpoint_path(json_file_path)
+        if max_bytes is None:
+            max_bytes = gsp_max_request_bytes if upload else max_request_bytes
+        try:
+            params = {**source_params(json_file_path), "max_bytes": max_bytes, "max_records": max_records}
+            checkpoint = LoadCheckpoint.open(checkpoint_path, params, resume)
+        except (OSError, ValueError) as e:
+            print(f"Error reading checkpoint: {e}")
+            return False
 
         if clean:
             print(f"Clearing Graph {graph_URI}...")
             clear_graph()
 
-
-
-        print(f"Loading ETDs from {json_file_path}...")
-        
-        # Read JSON data
-        with open(json_file_path, 'r') as f:
-            etds = json.load(f)
-        
-        if not isinstance(etds, list):
-            print(f"Error: Expected a list of ETDs, got {type(etds)}")
-            return False
-        
-        total_etds = len(etds)
-        print(f"Found {total_etds} ETDs to load")
-        
-        # Split into batches
-        batches = []
-        for i in range(0, total_etds, batch_size):
-            batches.append(etds[i:i+batch_size])
-        
-        total_batches = len(batches)
-        print(f"Split into {total_batches} batches of up to {batch_size} ETDs each")
-        
-        # Limit number of batches if requested
-        if max_batches is not None and max_batches < total_batches:
-            batches = batches[:max_batches]
-            print(f"Limited to {max_batches} batches as requested")
-        
-        total_loaded = 0
-        success_count = 0
-        failed_batches = []
-        
-        # Process batches in parallel
-        print(f"Processing batches with {num_workers} parallel workers...")
-        with ThreadPoolExecutor(max_workers=num_workers) as executor:
-            
-            futures = {executor.submit(load_batch, batch, i+1): i+1 for i, batch in enumerate(batches)}
-            
-            # Process as they complete
-            with tqdm(total=len(futures), desc="Loading ETDs") as progress:
-                for future in as_completed(futures):
-                    batch_num = futures[future]
-                    try:
-                        success, count = future.result()
-                        if success:
-                            success_count += 1
-                            total_loaded += count
-                        else:
-                            failed_batches.append(batch_num)
-                        progress.update(1)
-                    except Exception as e:
-                        print(f"Batch {batch_num} failed: {str(e)}")
-                        failed_batches.append(batch_num)
-                        progress.update(1)
+        print(f"Loading ETDs from {json_file_path} with {uploader.describe()}...")
+        
+        # Read JSON data (a JSON array, JSONL, optionally .gz/.zst compressed)
+        etds = read_dead_letters(json_file_path) if replay else iter_etds(json_file_path)
+        etds = metrics.timed(etds, "read")
+        
+        changed_ids = set()
+        if delta is not None:
+            def new_or_changed(records):
+                for etd, status in delta.filter(records, _delta_key):
+                    if status == "changed":
+                        changed_ids.add(str(etd['id']))
+                    yield etd
+            etds = new_or_changed(etds)
+        
+        # Split into batches of up to max_bytes of triples each
+        numbered = enumerate(iter_byte_batches(etds, max_bytes, max_records), 1)
+        if max_batches is not None:
+            numbered = itertools.islice(numbered, max_batches)
+        
+        size_limit = RequestSizeLimit()
+        stop = threading.Event()
+        stats = {"loaded": 0, "committed": 0, "skipped": 0}
+        batch_errors = {}
+        failed = {}
+        to_verify = {}
+        
+        def new_batches():
+            # Skip batches committed by a previous run
+            for batch_num, batch in numbered:
+                if checkpoint.is_committed(batch_num):
+                    stats["skipped"] += 1
+                else:
+                    yield batch_num, batch
+        
+        def batch_job(batch_num, batch, errors):
+            """Steps loading one batch and, with verify "batch", reading it back"""
+            if stop.is_set():
+                _record_error(errors, False, "not sent, load stopped after a failed verification")
+                return False, 0
+            replace_ids = [str(etd['id']) for etd in batch if str(etd['id']) in changed_ids]
+            batch_start = time.perf_counter()
+            success, count = yield from batch_steps(batch, batch_num, replace_ids, size_limit, errors, upload, metrics)
+            latency = time.perf_counter() - batch_start
+            if success and verify == "batch" and not (yield from verify_steps(batch, batch_num, errors, metrics)):
+                success, count = False, 0
+                if not force and not stop.is_set():
+                    stop.set()
+                    log("Stopping the load: data is not being persisted (use --force to keep loading)", 0)
+            metrics.record_batch(latency, count, success)
+            return success, count
+        
+        def jobs(pairs):
+            for batch_num, batch in pairs:
+                if stop.is_set():
+                    break
+                batch_errors[batch_num] = []
+                yield batch_num, batch, batch_job(batch_num, batch, batch_errors[batch_num])
+        
+        def finish(batch_num, batch, result):
+            if isinstance(result, Exception):
+                log(f"Batch {batch_num} failed: {str(result)}", 1)
+                batch_errors[batch_num].append((False, str(result)))
+                result = (False, 0)
+            success, count = result
+            if success:
+                stats["loaded"] += count
+                stats["committed"] += 1
+                failed.pop(batch_num, None)
+                checkpoint.mark_committed(batch_num, count)
+                if delta is not None:
+                    delta.commit(_delta_key(etd) for etd in batch)
+                if verify == "end":
+                    to_verify[batch_num] = batch
+            else:
+                failed[batch_num] = batch
+                checkpoint.mark_failed(batch_num)
+            if prometheus_path:
+                metrics.write_prometheus_every(prometheus_path)
+        
+        def run_round(pairs, desc):
+            with tqdm(desc=desc, unit=" batches", disable=verbosity < 1) as progress:
+                def on_done(batch_num, batch, result):
+                    finish(batch_num, batch, result)
+                    progress.update(1)
+                uploader.run(jobs(pairs), on_done, metrics)
+        
+        run_round(new_batches(), "Loading ETDs")
+        if stats["skipped"]:
+            print(f"Skipped {stats['skipped']} batches already committed")
+        
+        # Batches that failed with transient errors get one more round at
+        # the end of the run, after the rest have loaded
+        requeue = [(n, failed[n]) for n in sorted(failed) if batch_errors[n] and batch_errors[n][-1][0]]
+        if requeue and not stop.is_set():
+            print(f"Requeueing {len(requeue)} batches that failed with transient errors...")
+            run_round(requeue, "Requeued batches")
+        
+        # Read back a sample of every batch loaded in this run
+        if to_verify:
+            print(f"Verifying {len(to_verify)} loaded batches...")
+            for batch_num in sorted(to_verify):
+                batch = to_verify[batch_num]
+                if verify_loaded(batch, batch_num, batch_errors[batch_num], metrics):
+                    continue
+                stats["loaded"] -= len(batch)
+                stats["committed"] -= 1
+                failed[batch_num] = batch
+                checkpoint.mark_failed(batch_num, len(batch))
+                if delta is not None:
+                    delta.remove(str(etd.get('id', '')) for etd in batch)
+                if not force:
+                    print("Stopping verification: data is not being persisted (use --force to check every batch)")
+                    break
+        failed_batches = sorted(failed)
+        
+        # Keep the ETDs that could not be loaded for a later --replay run
+        if failed_batches:
+            write_dead_letters(dead_letter_path, [(n, failed[n]) for n in failed_batches], batch_errors)
+        elif max_batches is None and not stop.is_set() and os.path.exists(dead_letter_path):
+            os.remove(dead_letter_path)
         
         # Calculate statistics
         elapsed_time = time.time() - start_time
-        batches_processed = len(batches)
         
         print(f"\nLoading completed in {elapsed_time:.2f} seconds")
-        print(f"Successfully loaded {total_loaded} ETDs ({success_count}/{batches_processed} batches)")
+        print(f"Successfully loaded {stats['loaded']} ETDs ({stats['committed']} batches)")
+        size_limit.report()
+        extra = uploader.summary()
+        if delta is not None:
+            delta.report()
         
         if failed_batches:
-            failed_batches.sort()
             print(f"Failed batches: {failed_batches}")
+            print(f"ETDs of failed batches written to {dead_letter_path}; load them again with "
+                  f"'python VirtuosoLoader.py {dead_letter_path} --replay'")
+        if stop.is_set():
+            print("Load stopped early after a failed verification; the remaining batches were not sent")
         
         if elapsed_time > 0:
-            print(f"Average rate: {total_loaded/elapsed_time:.2f} ETDs per second")
+            print(f"Average rate: {stats['loaded']/elapsed_time:.2f} ETDs per second")
+        
+        succeeded = not failed_batches and not stop.is_set()
+        if delta is not None and delete_missing:
+            if not succeeded:
+                print("Not deleting missing ETDs because some batches failed")
+            else:
+                delete_missing_etds(delta)
+        
+        if verify:
+            extra["verification"] = {"mode": verify, **verification_summary(metrics, stats["loaded"])}
+        write_load_report(metrics, json_file_path, report_path, prometheus_path,
+                          params={**params, **uploader.settings, "upload": upload, "verify": verify},
+                          failed_batches=failed_batches, **extra)
         
         # Return success if all batches were processed successfully
-        return success_count == batches_processed
+        return succeeded
     
     except Exception as e:
         print(f"Error in ETD loading process: {str(e)}")
         return False
+    
+    finally:
+        # Only hashes of committed batches were recorded, so this is safe
+        # to save even after a failure
+        if delta is not None:
+            delta.save()
 
 def main():
     """Main function for command-line usage"""
     import argparse
+    global max_retries, verbosity, verify_sample_size
     
     # Add a warning about write operations
     print("\n" + "="*80)
@@ -304,15 +905,89 @@ def main():
     parser.add_argument('json_file', help='Path to the JSON file containing ETD metadata')
     parser.add_argument('--max-batches', type=int, help='Maximum number of batches to load')
     parser.add_argument('--workers', type=int, default=4, help='Number of parallel workers')
-    parser.add_argument('--force', action='store_true', help='Force loading even if write permission check fails')
+    parser.add_argument('--force', action='store_true', help='With --verify, keep loading even if batches fail verification')
     parser.add_argument('--clean', action='store_true', help='creates a new table to load into')
+    parser.add_argument('--resume', action='store_true', help='Skip batches already committed according to the checkpoint file')
+    parser.add_argument('--checkpoint', help='Checkpoint file path (default: <json_file>.checkpoint.json)')
+    parser.add_argument('--delta', metavar='MANIFEST', help='Only write new or changed ETDs, tracking content hashes in this manifest file')
+    parser.add_argument('--delete-missing', action='store_true', help='With --delta, delete ETDs that are no longer in the source')
+    parser.add_argument('--max-request-bytes', type=int,
+                        help=f'Build batches up to this many bytes of triples (default: {max_request_bytes}, '
+                             f'or {gsp_max_request_bytes} with --upload)')
+    parser.add_argument('--upload', choices=sorted(GSP_FORMATS),
+                        help='POST gzipped batches in this format to the Graph Store Protocol endpoint instead of INSERT DATA')
+    parser.add_argument('--batch-size', type=int, help='Also cap batches at this many ETDs')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='Load with asyncio and an async HTTP client (needs httpx)')
+    parser.add_argument('--concurrency', type=int, default=32, help='With --async, maximum requests in flight')
+    parser.add_argument('--export-ntriples', metavar='DIR', help="Write gzipped N-Triples shards for Virtuoso's bulk loader to DIR instead of loading")
+    parser.add_argument('--shard-size', type=int, default=10000, help='With --export-ntriples, ETDs per shard file; one shard per process is held in memory')
+    parser.add_argument('--processes', type=int, help='With --export-ntriples, processes writing shards (default: CPU count)')
+    parser.add_argument('--replay', action='store_true', help='json_file is a dead-letter file; load its ETDs again')
+    parser.add_argument('--dead-letter', help='File for ETDs that still fail (default: <json_file>.deadletter.jsonl)')
+    parser.add_argument('--retries', type=int, default=max_retries, help='Retries with backoff for transient request errors')
+    parser.add_argument('--connect-timeout', type=float, default=VirtuosoSession.connect_timeout, help='Seconds to wait for a connection to the endpoint')
+    parser.add_argument('--read-timeout', type=float, default=VirtuosoSession.read_timeout, help='Seconds to wait for the endpoint to respond')
+    parser.add_argument('--report', help='Load report path (default: <json_file>.report.json)')
+    parser.add_argument('--prometheus', metavar='PATH', help='Also write load metrics in Prometheus text format to PATH, updated during the load')
+    parser.add_argument('--verify', choices=['batch', 'end'],
+                        help='Read back a sample of each batch to check it persisted, right after it loads or after the whole load')
+    parser.add_argument('--verify-sample', type=int, default=verify_sample_size, help='With --verify, ETDs read back per batch')
+    parser.add_argument('-v', '--verbose', action='count', default=0, help='Print every batch, retry and server error response')
+    parser.add_argument('-q', '--quiet', action='store_true', help='Only print the summary, without progress bars or per-batch errors')
     args = parser.parse_args()
     
+    if args.resume and args.clean:
+        print("Error: --resume cannot be combined with --clean")
+        return False
+    if args.delta and args.resume:
+        print("Error: --delta cannot be combined with --resume")
+        return False
+    if args.delete_missing and not args.delta:
+        print("Error: --delete-missing requires --delta")
+        return False
+    
+    VirtuosoSession.configure(connect=args.connect_timeout, read=args.read_timeout)
+    
+    if args.replay and (args.delta or args.clean):
+        print("Error: --replay cannot be combined with --delta or --clean")
+        return False
+    if args.retries < 0:
+        print("Error: --retries cannot be negative")
+        return False
+    max_retries = args.retries
+    verbosity = 0 if args.quiet else 1 + args.verbose
+    
+    if args.concurrency < 1:
+        print("Error: --concurrency must be at least 1")
+        return False
+    if args.max_request_bytes is not None and args.max_request_bytes < 1024:
+        print("Error: --max-request-bytes must be at least 1024")
+        return False
+    if args.batch_size is not None and args.batch_size < 1:
+        print("Error: --batch-size must be at least 1")
+        return False
+    if args.verify_sample < 1:
+        print("Error: --verify-sample must be at least 1")
+        return False
+    verify_sample_size = args.verify_sample
+    
     if not os.path.exists(args.json_file):
         print(f"Error: JSON file not found: {args.json_file}")
         return False
     
-    return load_etds_from_json(args.json_file, args.max_batches, args.workers, args.clean)
+    if args.export_ntriples:
+        if args.verify:
+            print("Error: --verify cannot be combined with --export-ntriples")
+            return False
+        if args.shard_size < 1:
+            print("Error: --shard-size must be at least 1")
+            return False
+        return export_ntriples(args.json_file, args.export_ntriples, args.shard_size, args.processes)
+    
+    return load_etds_from_json(args.json_file, args.max_batches, args.workers, args.clean, args.resume, args.checkpoint,
+                               args.delta, args.delete_missing, args.max_request_bytes, args.batch_size,
+                               args.replay, args.dead_letter, args.upload, args.report, args.prometheus,
+                               args.verify, args.force, args.concurrency if args.use_async else None)
 
 if __name__ == "__main__":
     success = main()
@@ -1,33 +1,100 @@
-import requests
-from requests.auth import HTTPDigestAuth
+import VirtuosoSession
 import json
+from urllib.parse import urlencode
+from QueryCache import QueryCache, normalize_query
 
 # Configuration - same as in DBaccess.py
 endpoint_URL = "https://virtuoso.endeavour.cs.vt.edu/sparql-auth"
 graph_URI = "http://erdkb.endeavour.cs.vt.edu/ETDs"
 username = "dba"
 password = "admin"
+cache_size = 256  # SELECT results kept in memory (change with configure_cache)
+cache_ttl = 300  # seconds a cached result is served without asking the server
+max_get_query_length = 2000  # longer SELECTs are POSTed, URLs this long are safe through proxies
+
+SELECT_HEADERS = {"Accept": "application/sparql-results+json"}
+
+result_cache = QueryCache(cache_size, cache_ttl)
+
+def configure_cache(size=None, ttl=None):
+    """
+    Change how many SELECT results are cached or for how many seconds
+    they are served without asking the server.
+
+    The cache is replaced, so results cached so far are dropped.
+    """
+    global cache_size, cache_ttl, result_cache
+    if size is not None:
+        cache_size = size
+    if ttl is not None:
+        cache_ttl = ttl
+    result_cache = QueryCache(cache_size, cache_ttl)
+
+class SelectResult:
+    """
+    Parsed result of a SELECT, with the parts of a requests Response the
+    query functions use. Shared between callers through the cache, so
+    treat it as read-only.
+    """
+
+    def __init__(self, payload):
+        self.status_code = 200
+        self.reason = "OK"
+        self.payload = payload
+
+    def json(self):
+        return self.payload
 
 def send_query(query):
-    """Send a SPARQL query to the Virtuoso endpoint"""
+    """Send a SPARQL update to the Virtuoso endpoint"""
     headers = {
         "Content-Type": "application/sparql-update; charset=utf-8",
         "Accept": "application/sparql-results+json"
     }
 
-    response = requests.post(
-        endpoint_URL,
-        data=query.encode('utf-8'),
-        auth=HTTPDigestAuth(username, password),
-        headers=headers
-    )
+    response = VirtuosoSession.post(endpoint_URL, query.encode('utf-8'), headers, username, password)
     return response
 
+def send_select(query):
+    """
+    Send a read-only SPARQL query, answering repeats from the result cache
+
+    Short queries are sent as GET and long ones as POST with
+    application/sparql-query. Once a cached result is older than
+    cache_ttl it is revalidated with If-None-Match if the server sent an
+    ETag, otherwise fetched again. Returns a SelectResult, or the
+    response itself if the query failed.
+    """
+    key = normalize_query(query)
+    cached = result_cache.get(key)
+    if cached is not None and cached[2]:
+        return cached[0]
+
+    headers = dict(SELECT_HEADERS)
+    if cached is not None:
+        headers["If-None-Match"] = cached[1]
+    params = {"query": query}
+    if len(urlencode(params)) <= max_get_query_length:
+        response = VirtuosoSession.get(endpoint_URL, params, headers, username, password)
+    else:
+        headers["Content-Type"] = "application/sparql-query; charset=utf-8"
+        response = VirtuosoSession.post(endpoint_URL, query.encode('utf-8'), headers, username, password)
+
+    if response.status_code == 304 and cached is not None:
+        return result_cache.refresh(key) or cached[0]
+    if response.status_code != 200:
+        return response
+    result = SelectResult(response.json())
+    if "no-store" not in response.headers.get("Cache-Control", ""):
+        result_cache.put(key, result, response.headers.get("ETag"))
+    return result
+
 def clear_graph():
     query = f"""
     DROP GRAPH <{graph_URI}>
     """
     response = send_query(query)
+    result_cache.clear()
 
     if response.status_code != 200:
         print(f"Failed: {response.status_code} {response.reason}")
@@ -52,7 +119,7 @@ def get_etd_titles(limit=100):
     WHERE {{?s <http://etdkb.endeavour.cs.vt.edu/v1/predicate/hasTitle> ?o}}
     LIMIT {limit}
     """
-    response = send_query(query)
+    response = send_select(query)
 
     if response.status_code == 200:
         return response.json()["results"]["bindings"]
@@ -67,7 +134,7 @@ def get_etd_link(iri):
     WHERE {{<{iri}> <http://etdkb.endeavour.cs.vt.edu/v1/predicate/identifier> ?o}}
     LIMIT 1
     """
-    response = send_query(query)
+    response = send_select(query)
     
     if response.status_code == 200 and response.json()["results"]["bindings"]:
         link = response.json()["results"]["bindings"][0]["o"]["value"]
@@ -84,7 +151,7 @@ def get_etd_metadata(iri):
     WHERE {{<{iri}> ?p ?o}}
     LIMIT 50
     """
-    response = send_query(query)
+    response = send_select(query)
     
     if response.status_code != 200:
         print(f"Failed: {response.status_code} {response.reason}")
@@ -124,7 +191,7 @@ def search_etds_by_keyword(keyword, limit=100, pred='title'):
     }}
     LIMIT {limit}
     """
-    response = send_query(query)
+    response = send_select(query)
     
     if response.status_code == 200:
         return response.json()["results"]["bindings"]
@@ -142,7 +209,7 @@ def get_etds_by_year(year, limit=100):
     }}
     LIMIT {limit}
     """
-    response = send_query(query)
+    response = send_select(query)
     
     if response.status_code == 200:
         return response.json()["results"]["bindings"]
@@ -158,7 +225,7 @@ def get_etd_count():
         ?s <http://etdkb.endeavour.cs.vt.edu/v1/predicate/hasTitle> ?title .
     }}
     """
-    response = send_query(query)
+    response = send_select(query)
     
     if response.status_code == 200 and response.json()["results"]["bindings"]:
         count = response.json()["results"]["bindings"][0]["count"]["value"]
@@ -0,0 +1,78 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPDigestAuth
+
+# Connection settings shared by VirtuosoLoader and VirtuosoQueries
+pool_size = 4  # Keep-alive connections per endpoint, match the loader's --workers
+connect_timeout = 10  # seconds
+read_timeout = 300  # seconds, large INSERT DATA batches can take a while
+
+_sessions = {}
+_lock = threading.Lock()
+
+class RequestError(Exception):
+    """
+    A request that got no response (connection error or timeout), from
+    either the requests or the httpx client. reason is the client's
+    exception name; timeout is True for a read timeout.
+    """
+
+    def __init__(self, error, timeout=False):
+        super().__init__(str(error))
+        self.reason = type(error).__name__
+        self.timeout = timeout
+
+def configure(workers=None, connect=None, read=None):
+    """
+    Change the pool size (one connection per worker) or the connect and
+    read timeouts in seconds.
+
+    Open sessions are closed so the next request picks up the new pool
+    size; call this before starting worker threads.
+    """
+    global pool_size, connect_timeout, read_timeout
+    if workers is not None:
+        pool_size = workers
+    if connect is not None:
+        connect_timeout = connect
+    if read is not None:
+        read_timeout = read
+    close_all()
+
+def get_session(username, password):
+    """
+    Return the shared session for these credentials.
+
+    HTTPDigestAuth keeps its nonce per thread, so after the first 401
+    challenge each worker thread sends the Authorization header up front
+    and reuses a pooled keep-alive connection.
+    """
+    key = (username, password)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            session.auth = HTTPDigestAuth(username, password)
+            # Block rather than open extra connections when every worker is busy
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[key] = session
+        return session
+
+def post(url, data, headers, username, password):
+    """POST to the endpoint through the shared session, with the configured timeouts"""
+    session = get_session(username, password)
+    return session.post(url, data=data, headers=headers, timeout=(connect_timeout, read_timeout))
+
+def get(url, params, headers, username, password):
+    """GET from the endpoint through the shared session, with the configured timeouts"""
+    session = get_session(username, password)
+    return session.get(url, params=params, headers=headers, timeout=(connect_timeout, read_timeout))
+
+def close_all():
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,57 @@
+import csv
+import os
+import re
+
+import pytest
+
+from CSVtoJSON import export_neo4j_import, iter_csv_etds
+
+TEST_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Test_ETD_10.csv")
+
+def read_csv(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+def test_import_hash_matches_loader(tmp_path):
+    pytest.importorskip("neo4j")
+    from Neo4j_loader_v2 import prepare_etd
+
+    assert export_neo4j_import(TEST_CSV, str(tmp_path))
+    hashes = {row["value"]: row["hash"] for row in read_csv(tmp_path / "nodes_Title.csv")}
+
+    # The import still links the columns the JSON output leaves out
+    assert read_csv(tmp_path / "rels_WRITTEN_IN.csv")
+
+    rows = [prepare_etd(etd) for etd in iter_csv_etds(TEST_CSV)]
+    assert rows
+    for row in rows:
+        assert hashes[row["title"]] == row["hash"]
+
+def loader_properties(query):
+    """Properties a loader write query sets: its MERGE key and SET targets"""
+    return set(re.findall(r"MERGE \(\w+:\w+ \{(\w+): row\.", query)) | set(re.findall(r"\b[a-z]+\.(\w+) = ", query))
+
+def test_import_node_properties_match_loader(tmp_path):
+    pytest.importorskip("neo4j")
+    from Neo4j_loader_v2 import DIMENSION_QUERIES, TITLE_QUERY
+    from ETDSchema import DIMENSIONS
+
+    assert export_neo4j_import(TEST_CSV, str(tmp_path))
+    queries = {"Title": TITLE_QUERY}
+    queries.update({label: DIMENSION_QUERIES[field] for field, label, _, _ in DIMENSIONS})
+
+    for label, query in queries.items():
+        with open(tmp_path / f"nodes_{label}.csv", encoding="utf-8", newline="") as f:
+            header = next(csv.reader(f))
+        # Named :ID columns would be stored as extra node properties
+        assert header[0] == f":ID({label})"
+        assert set(header[1:]) <= loader_properties(query), label
+
+def test_embedded_line_breaks_are_normalized(tmp_path):
+    # Quoted fields with CRLF or CR line breaks come out with \n, as
+    # when the CSV was read with universal newlines
+    csv_path = tmp_path / "etds.csv"
+    csv_path.write_bytes(b'id,title,abstract\r\n1,"a\r\nb","c\rd"\r\n2,"e\nf",g\r\n')
+
+    etds = list(iter_csv_etds(str(csv_path)))
+    assert [(etd["title"], etd["abstract"]) for etd in etds] == [("a\nb", "c\nd"), ("e\nf", "g")]
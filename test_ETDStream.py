@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from ETDStream import iter_etds
+
+CHUNK_SIZES = range(1, 12)
+
+RECORDS = [
+    {"id": "1", "title": "A", "pages": 3e10, "scores": [1.5, 2, 3e10, -7]},
+    {"id": "2", "title": "B \"quoted\" ]}", "pages": -12, "done": True, "notes": None},
+    {"id": "3", "title": "C", "pages": 1.25e-3, "done": False},
+]
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_number_split_at_chunk_boundary(tmp_path, chunk_size):
+    # "3e10" cut after "3e" must not be read as 3
+    path = tmp_path / "numbers.json"
+    path.write_text("3e10")
+    assert list(iter_etds(str(path), chunk_size=chunk_size)) == [3e10]
+
+def test_numeric_array_with_chunk_size_7(tmp_path):
+    path = tmp_path / "numbers.json"
+    path.write_text("[1.5,2,3e10,-7]")
+    assert list(iter_etds(str(path), chunk_size=7)) == [1.5, 2, 3e10, -7]
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_json_array(tmp_path, chunk_size):
+    path = tmp_path / "etds.json"
+    path.write_text(json.dumps(RECORDS))
+    assert list(iter_etds(str(path), chunk_size=chunk_size)) == RECORDS
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_object_wrapping_array(tmp_path, chunk_size):
+    path = tmp_path / "etds.json"
+    path.write_text(json.dumps({"count": 3, "etds": RECORDS}, indent=1))
+    assert list(iter_etds(str(path), chunk_size=chunk_size)) == RECORDS
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_jsonl(tmp_path, chunk_size):
+    path = tmp_path / "etds.jsonl"
+    path.write_text("".join(json.dumps(record, separators=(",", ":")) + "\n" for record in RECORDS))
+    assert list(iter_etds(str(path), chunk_size=chunk_size)) == RECORDS
@@ -0,0 +1,63 @@
+import pytest
+
+pytest.importorskip("neo4j")
+
+from DeltaManifest import DeltaManifest
+from Neo4j_loader_v2 import DELETE_TITLES_QUERY, TITLE_QUERY, _iter_delta, prepare_etd, write_batch
+
+class FakeResult:
+    def consume(self):
+        pass
+
+class FakeTx:
+    """Applies the Title writes and deletes of write_batch to a dict of Title value -> row"""
+
+    def __init__(self, titles):
+        self.titles = titles
+
+    def run(self, query, **params):
+        if query == DELETE_TITLES_QUERY:
+            for title in params["titles"]:
+                self.titles.pop(title, None)
+        elif query == TITLE_QUERY:
+            for row in params["rows"]:
+                self.titles[row["title"]] = row
+        return FakeResult()
+
+def delta_load(manifest_path, etds, titles):
+    delta = DeltaManifest.open(str(manifest_path))
+    rows = list(_iter_delta((prepare_etd(etd) for etd in etds), delta, count=True))
+    write_batch(FakeTx(titles), rows)
+    delta.commit((row["title"], row["hash"]) for row in rows)
+    delta.save()
+    return delta
+
+def test_delta_replaces_titles_sharing_an_id(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    titles = {}
+    etds = [{"id": "5", "title": "A", "year": "2001"}, {"id": "5", "title": "B", "year": "2002"}]
+    delta_load(manifest, etds, titles)
+    assert set(titles) == {"A", "B"}
+
+    # Changing one Title must not delete the other one with the same id
+    etds[0]["year"] = "2003"
+    delta = delta_load(manifest, etds, titles)
+    assert delta.counts == {"new": 0, "changed": 1, "unchanged": 1, "repeated": 0}
+    assert titles["A"]["year"] == "2003" and titles["B"]["year"] == "2002"
+
+    etds[1]["year"] = "2004"
+    delta_load(manifest, etds, titles)
+    assert titles["A"]["year"] == "2003" and titles["B"]["year"] == "2004"
+
+def test_repeated_title_is_merged_not_replaced(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    etds = [{"id": "1", "title": "A", "year": "2001"}, {"id": "2", "title": "A", "year": "2002"}]
+    delta = delta_load(manifest, etds, {})
+    first_hash = prepare_etd(etds[0])["hash"]
+    assert delta.hashes == {"A": first_hash}
+
+    # The first record is unchanged; the repeat is still written, without a delete
+    delta = DeltaManifest.open(str(manifest))
+    rows = list(_iter_delta((prepare_etd(etd) for etd in etds), delta, count=True))
+    assert [(row["id"], row["changed"]) for row in rows] == [("2", False)]
+    assert delta.counts["unchanged"] == 1 and delta.counts["repeated"] == 1